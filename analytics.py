@@ -0,0 +1,200 @@
+import logging
+from datetime import timedelta
+
+import numpy as np
+
+from db import create_nav_history_changes_table_if_not_exists
+from valuation import EPOCH
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_FUND_CHUNK = 500  # funds whose history is loaded and computed together
+WINDOWS = {'1y': 365, '3y': 3 * 365 + 1, '5y': 5 * 365 + 1}  # trailing windows, in calendar days
+WINDOW_START_SLACK = 7  # a window may start this many days early when its first day had no NAV
+TRADING_DAYS = 252
+
+FUND_ANALYTICS_COLUMNS = [f'{metric}_{label}' for label in WINDOWS
+                          for metric in ('cagr', 'volatility', 'max_drawdown')]
+
+
+def create_fund_analytics_table_if_not_exists(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fund_analytics (
+            fund_id INT PRIMARY KEY,
+            as_of_date DATE NOT NULL,
+            history_rows INT NOT NULL,
+            cagr_1y FLOAT, volatility_1y FLOAT, max_drawdown_1y FLOAT,
+            cagr_3y FLOAT, volatility_3y FLOAT, max_drawdown_3y FLOAT,
+            cagr_5y FLOAT, volatility_5y FLOAT, max_drawdown_5y FLOAT,
+            computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (fund_id) REFERENCES mutual_funds(fund_id)
+        )
+    """)
+
+
+def compute_fund_analytics(fund_ids, days, navs):
+    """Trailing CAGR, annualised volatility and max drawdown for many funds at once.
+
+    fund_ids, days (days since the epoch) and navs are NAV history rows sorted by
+    (fund_id, day). Every window ends at the fund's latest NAV; a fund with less history
+    than a window gets NaN for it. Volatility is the annualised standard deviation of
+    daily log returns, max drawdown the worst fall from a running peak (e.g. -0.35).
+    history_rows counts the NAVs inside the longest window that the metrics drew on.
+    """
+    funds, starts, counts = np.unique(fund_ids, return_index=True, return_counts=True)
+    n_funds = len(funds)
+    group = np.repeat(np.arange(n_funds), counts)
+    ends = starts + counts - 1
+    end_day = days[ends]
+    horizon = end_day - max(WINDOWS.values()) - WINDOW_START_SLACK
+    history_rows = np.bincount(group, weights=days >= horizon[group], minlength=n_funds).astype(np.int64)
+    result = {'fund_id': funds, 'as_of_day': end_day, 'history_rows': history_rows}
+
+    log_nav = np.log(navs)
+    daily_return = np.diff(log_nav, prepend=np.nan)
+    daily_return[starts] = np.nan  # the first row of each fund follows another fund's last
+    # Searches by (fund, day) and a running peak that restarts per fund both work on
+    # one flat array once every fund's values are lifted above the previous fund's.
+    key = group * (1 << 32) + (days - days.min())
+    lift = group * (log_nav.max() - log_nav.min() + 1.0)
+
+    for label, window in WINDOWS.items():
+        # Start of the window: the last NAV on or before end_day - window.
+        target = end_day - window
+        start = np.searchsorted(key, np.arange(n_funds) * (1 << 32) + (target - days.min()), side='right') - 1
+        covered = (start >= starts) & (days[np.maximum(start, 0)] >= target - WINDOW_START_SLACK)
+        start = np.where(covered, start, starts)
+        start_day = days[start]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cagr = np.exp((log_nav[ends] - log_nav[start]) * 365.25 / (end_day - start_day)) - 1.0
+
+        in_window = covered[group] & (days >= start_day[group])
+        has_return = in_window & (days > start_day[group])
+        returns = np.where(has_return, daily_return, 0.0)
+        n = np.bincount(group, weights=has_return, minlength=n_funds)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.bincount(group, weights=returns, minlength=n_funds) / n
+            squared = np.where(has_return, (daily_return - mean[group]) ** 2, 0.0)
+            volatility = np.sqrt(np.bincount(group, weights=squared, minlength=n_funds) / (n - 1) * TRADING_DAYS)
+
+        rows = np.flatnonzero(in_window)
+        max_drawdown = np.full(n_funds, np.nan)
+        if len(rows):
+            lifted = log_nav[rows] + lift[rows]
+            drawdown = np.expm1(lifted - np.maximum.accumulate(lifted))
+            window_groups = group[rows]
+            first = np.flatnonzero(np.diff(window_groups, prepend=-1))
+            max_drawdown[window_groups[first]] = np.minimum.reduceat(drawdown, first)
+
+        result[f'cagr_{label}'] = np.where(covered, cagr, np.nan)
+        result[f'volatility_{label}'] = np.where(covered & (n > 1), volatility, np.nan)
+        result[f'max_drawdown_{label}'] = np.where(covered, max_drawdown, np.nan)
+    return result
+
+
+def find_stale_funds(connection):
+    """[(fund_id, last_nav_date, changed_at)] for funds whose analytics need recomputing.
+
+    Those are the funds load_nav_history marked in nav_history_changes, plus funds with
+    no analytics yet. Only their latest NAV dates are read, one index probe per fund, so
+    the check costs nothing like a scan of nav_history. last_nav_date is None for a fund
+    without history, and changed_at is None for a fund that was not marked.
+    """
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT f.fund_id,
+            (SELECT MAX(h.nav_date) FROM nav_history h WHERE h.fund_id = f.fund_id),
+            c.changed_at
+        FROM mutual_funds f
+        LEFT JOIN nav_history_changes c ON c.fund_id = f.fund_id
+        LEFT JOIN fund_analytics a ON a.fund_id = f.fund_id
+        WHERE c.fund_id IS NOT NULL OR a.fund_id IS NULL
+    """)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def clear_nav_history_changes(connection, stale):
+    """Drop the marks of funds that were recomputed, unless a load marked them again since."""
+    marks = [(fund_id, changed_at) for fund_id, _, changed_at in stale if changed_at is not None]
+    if not marks:
+        return
+    cursor = connection.cursor()
+    cursor.executemany("DELETE FROM nav_history_changes WHERE fund_id = %s AND changed_at = %s", marks)
+    connection.commit()
+    cursor.close()
+
+
+def load_history(connection, fund_ids, first_date):
+    """NAV history of fund_ids from first_date on, as (fund_ids, days, navs) sorted by fund and day."""
+    placeholders = ', '.join(['%s'] * len(fund_ids))
+    cursor = connection.cursor()
+    # Days are computed by MySQL: converting millions of date objects in Python costs more than the query.
+    cursor.execute(f"""
+        SELECT fund_id, DATEDIFF(nav_date, '1970-01-01'), nav
+        FROM nav_history
+        WHERE fund_id IN ({placeholders}) AND nav_date >= %s AND nav > 0
+        ORDER BY fund_id, nav_date
+    """, [*fund_ids, first_date])
+    rows = cursor.fetchall()
+    cursor.close()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    fund_id, days, navs = zip(*rows)
+    return np.array(fund_id, dtype=np.int64), np.array(days, dtype=np.int64), np.array(navs, dtype=np.float64)
+
+
+def save_fund_analytics(connection, result):
+    cursor = connection.cursor()
+    columns = ', '.join(FUND_ANALYTICS_COLUMNS)
+    updates = ',\n            '.join(f'{column} = VALUES({column})' for column in FUND_ANALYTICS_COLUMNS)
+    query = f"""
+        INSERT INTO fund_analytics (fund_id, as_of_date, history_rows, {columns})
+        VALUES ({', '.join(['%s'] * (3 + len(FUND_ANALYTICS_COLUMNS)))})
+        ON DUPLICATE KEY UPDATE
+            as_of_date = VALUES(as_of_date),
+            history_rows = VALUES(history_rows),
+            {updates}
+    """
+    as_of_dates = (EPOCH + result['as_of_day']).astype(object)
+    metrics = np.column_stack([result[column] for column in FUND_ANALYTICS_COLUMNS]).tolist()
+    rows = [
+        (int(fund_id), as_of_date, int(history_rows),
+         *(None if np.isnan(value) else value for value in values))
+        for fund_id, as_of_date, history_rows, values
+        in zip(result['fund_id'], as_of_dates, result['history_rows'], metrics)
+    ]
+    cursor.executemany(query, rows)
+    connection.commit()
+    cursor.close()
+    return len(rows)
+
+
+def update_fund_analytics(connection, chunk_size=ANALYTICS_FUND_CHUNK):
+    """Recompute fund_analytics for every fund whose NAV history changed. Returns the number updated."""
+    cursor = connection.cursor()
+    create_fund_analytics_table_if_not_exists(cursor)
+    create_nav_history_changes_table_if_not_exists(cursor)
+    cursor.close()
+
+    stale = find_stale_funds(connection)
+    clear_nav_history_changes(connection, [row for row in stale if row[1] is None])
+    stale = [row for row in stale if row[1] is not None]
+    if not stale:
+        logger.info("Fund analytics are up to date")
+        return 0
+    # Funds with similar last NAV dates share a chunk, so each chunk's date range stays tight.
+    stale.sort(key=lambda row: (row[1], row[0]))
+    lookback = timedelta(days=max(WINDOWS.values()) + WINDOW_START_SLACK)
+
+    updated = 0
+    for i in range(0, len(stale), chunk_size):
+        chunk = stale[i:i + chunk_size]
+        fund_ids, days, navs = load_history(connection, [row[0] for row in chunk], chunk[0][1] - lookback)
+        if len(fund_ids):
+            updated += save_fund_analytics(connection, compute_fund_analytics(fund_ids, days, navs))
+        clear_nav_history_changes(connection, chunk)
+    logger.info(f"Updated analytics for {updated} of {len(stale)} funds with changed NAV history")
+    return updated
@@ -0,0 +1,58 @@
+"""Time compute_fund_analytics (CAGR, volatility, max drawdown) on synthetic NAV histories.
+
+    python benchmarks/bench_analytics.py --funds 40000 --years 6
+
+Histories are generated and computed one chunk of funds at a time, the way
+update_fund_analytics loads them, so memory stays at one chunk's worth of rows.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+from analytics import ANALYTICS_FUND_CHUNK, compute_fund_analytics  # noqa: E402
+
+
+def synthetic_history(first_fund_id, n_funds, years, rng):
+    """Business-day NAVs for n_funds funds; a third of them launched partway through."""
+    business_days = np.flatnonzero(np.arange(int(years * 365)) % 7 < 5) + 19000
+    launch = np.where(rng.random(n_funds) < 0.33, rng.integers(0, len(business_days), n_funds), 0)
+    counts = len(business_days) - launch
+    fund_ids = np.repeat(np.arange(first_fund_id, first_fund_id + n_funds), counts)
+    days = np.concatenate([business_days[start:] for start in launch])
+    returns = rng.normal(0.0004, 0.011, len(days))
+    navs = 10 * np.exp(np.cumsum(returns) - np.repeat(np.cumsum(returns)[np.cumsum(counts) - counts], counts))
+    return fund_ids, days, navs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--funds', type=int, default=40000)
+    parser.add_argument('--years', type=float, default=6)
+    parser.add_argument('--chunk', type=int, default=ANALYTICS_FUND_CHUNK)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    elapsed = 0.0
+    rows = 0
+    covered = 0
+    for first in range(1, args.funds + 1, args.chunk):
+        fund_ids, days, navs = synthetic_history(first, min(args.chunk, args.funds - first + 1), args.years, rng)
+        started = time.perf_counter()
+        result = compute_fund_analytics(fund_ids, days, navs)
+        elapsed += time.perf_counter() - started
+        rows += len(fund_ids)
+        covered += int(np.isfinite(result['cagr_5y']).sum())
+
+    print(f"{args.funds} funds, {rows:,} NAV rows in chunks of {args.chunk}")
+    print(f"computed in {elapsed:.2f}s ({args.funds / elapsed:,.0f} funds/s, {rows / elapsed:,.0f} rows/s); "
+          f"{covered} funds have 5 years of history")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""Load-test /home (the portfolio dashboard) on a SQLite-backed app.
+
+    python benchmarks/bench_dashboard.py                          # 5, 15 and 40 holdings per user
+    python benchmarks/bench_dashboard.py --holdings 25 --clients 8 --duration 5
+
+For each holding count, concurrent clients cycle through logged-in users' /home pages
+twice: once with the portfolio fragment cache disabled (every request runs the joined
+query and renders the fragment) and once with it enabled, where a request costs a
+holdings-stamp read unless --sip-rate of requests follow a new SIP instalment.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def seed(db, models, User, password_hash, funds, holdings_levels, users_per_level):
+    rng = random.Random(7)
+    db.session.add_all([
+        models.MutualFund(fund_id=fund_id, fund_code=str(100000 + fund_id), fund_name=f"Scheme {fund_id} - Direct Plan - Growth",
+                          category='Equity Scheme - Flexi Cap Fund', current_nav=Decimal(rng.randint(1000, 90000)) / 100,
+                          last_updated=datetime(2026, 1, 2))
+        for fund_id in range(1, funds + 1)
+    ])
+    db.session.add_all([
+        models.FundAnalytics(fund_id=fund_id, as_of_date=date(2026, 1, 2), history_rows=1500,
+                             cagr_1y=rng.uniform(-0.1, 0.3))
+        for fund_id in range(1, funds + 1)
+    ])
+    db.session.add(models.IngestState(name='nav', version=1))
+    users = {}
+    user_id = 0
+    for level in holdings_levels:
+        users[level] = []
+        for _ in range(users_per_level):
+            user_id += 1
+            db.session.add(User(user_id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com",
+                                password_hash=password_hash))
+            for fund_id in rng.sample(range(1, funds + 1), level):
+                units = Decimal(rng.randint(1000, 500000)) / 100
+                db.session.add(models.PortfolioHolding(user_id=user_id, fund_id=fund_id, total_units=units))
+                db.session.add(models.PortfolioValuation(user_id=user_id, fund_id=fund_id, as_of_date=date(2026, 1, 1),
+                                                         units=units, invested=units * 40, xirr=rng.uniform(-0.05, 0.25)))
+            users[level].append(user_id)
+    db.session.commit()
+    return users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--holdings', type=int, nargs='+', default=[5, 15, 40], help='holdings per user')
+    parser.add_argument('--users', type=int, default=100, help='users per holding count')
+    parser.add_argument('--funds', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--sessions', type=int, default=10, help='logged-in users each client cycles through')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds of load per run')
+    parser.add_argument('--sip-rate', type=float, default=0.02,
+                        help='share of requests preceded by a new SIP instalment for that user')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_dashboard.db')
+    os.environ['RUPYA_DATABASE_URI'] = f"sqlite:///{db_path}"
+
+    import logging
+    logging.disable(logging.CRITICAL)  # backend logs the empty database at import
+    import requests
+    from werkzeug.serving import make_server
+    import models
+    import backend
+    from backend import app, db, User
+    from passwords import configure_hashing, hash_password
+
+    configure_hashing(0)
+    app.config['BCRYPT_LOG_ROUNDS'] = 4
+    with app.app_context():
+        db.create_all()
+        users = seed(db, models, User, hash_password('benchmark-password', 4), args.funds, args.holdings, args.users)
+    holdings = models.PortfolioHolding.__table__
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    def login(user_id):
+        session = requests.Session()
+        response = session.post(f"{base_url}/login", allow_redirects=False,
+                                data={'username': f"user{user_id}", 'password': 'benchmark-password'})
+        assert response.status_code == 302, response.status_code
+        return user_id, session
+
+    def run(level, cached):
+        backend.portfolio_cache.clear()
+        backend.portfolio_cache.maxsize = 10000 if cached else 0
+        latencies = []
+        failures = []
+        lock = threading.Lock()
+        sessions = [[login(user_id) for user_id in random.sample(users[level], args.sessions)]
+                    for _ in range(args.clients)]
+        deadline = time.perf_counter() + args.duration
+
+        def client(client_sessions):
+            local_latencies = []
+            local_failures = 0
+            while time.perf_counter() < deadline:
+                user_id, session = random.choice(client_sessions)
+                if random.random() < args.sip_rate:
+                    with app.app_context():
+                        db.session.execute(
+                            holdings.update()
+                            .where(holdings.c.user_id == user_id)
+                            .values(total_units=holdings.c.total_units + 1, last_updated=datetime.now()))
+                        db.session.commit()
+                started = time.perf_counter()
+                response = session.get(f"{base_url}/home")
+                local_latencies.append(time.perf_counter() - started)
+                if response.status_code != 200 or 'Your portfolio' not in response.text:
+                    local_failures += 1
+            with lock:
+                latencies.extend(local_latencies)
+                failures.append(local_failures)
+
+        threads = [threading.Thread(target=client, args=(client_sessions,)) for client_sessions in sessions]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return len(latencies) / elapsed, latencies, sum(failures)
+
+    print(f"{args.clients} clients, {args.duration:.0f}s per run, {args.sip_rate:.0%} of requests after a new SIP")
+    print(f"{'holdings':>8} {'cache':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'failed':>7}")
+    for level in args.holdings:
+        for cached in (False, True):
+            throughput, latencies, failed = run(level, cached)
+            print(f"{level:>8} {'on' if cached else 'off':>6} {throughput:>8.1f} "
+                  f"{percentile(latencies, 0.50) * 1000:>8.1f} {percentile(latencies, 0.95) * 1000:>8.1f} "
+                  f"{percentile(latencies, 0.99) * 1000:>8.1f} {failed:>7}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
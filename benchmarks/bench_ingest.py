@@ -0,0 +1,231 @@
+"""End-to-end ingest benchmark against the stub AMFI server and an in-memory database.
+
+Runs update_mutual_fund_data, check_and_add_new_schemes and insert_or_update_fund
+from mainapp/test.py at several scheme counts, each case in its own process so peak
+RSS is per case, and compares the results with a stored baseline:
+
+    python benchmarks/bench_ingest.py                      # 1k, 5k, 20k, 50k schemes
+    python benchmarks/bench_ingest.py --schemes 1000 5000 --latency 0.02 --error-rate 0.01
+    python benchmarks/bench_ingest.py --save-baseline      # record the current numbers
+
+Exits non-zero when a case did not do its work (the ingest jobs log and swallow their
+errors, so a failed run would otherwise look like a fast one), or when throughput drops,
+or peak RSS grows, by more than --tolerance.
+"""
+import argparse
+import functools
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'mainapp'), BENCH_DIR]
+
+BASELINE_PATH = os.path.join(BENCH_DIR, 'ingest_baseline.json')
+CASES = ('update', 'new_schemes', 'insert')
+MIN_COMPARABLE_SECONDS = 0.05  # faster cases are timer noise; only their RSS is checked
+
+
+class StubMftool:
+    """The slice of the Mftool API the ingest uses, served by the stub instead of AMFI/mfapi."""
+
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url
+        self._session = requests.Session()
+
+    def _latest(self, code):
+        response = self._session.get(f"{self.base_url}/mf/{code}/latest", timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def get_scheme_quote(self, code):
+        payload = self._latest(code)
+        latest = payload['data'][0]
+        nav_date = datetime.strptime(latest['date'], '%d-%m-%Y')
+        return {
+            'scheme_code': str(code),
+            'scheme_name': payload['meta']['scheme_name'],
+            'nav': latest['nav'],
+            'last_updated': nav_date.strftime('%d-%b-%Y'),
+        }
+
+    def get_scheme_details(self, code):
+        return dict(self._latest(code)['meta'])
+
+
+def check_work(case, database, codes, schemes, new_schemes, error_rate):
+    """Why the run in `database` did not do the work its case measures, or None."""
+    import fake_mysql
+    if case == 'update':
+        updated = sum(1 for fund in database.funds.values() if fund[5] != fake_mysql.SEEDED_NAV_DATE)
+        expected, done = len(codes), min(updated, len(database.nav_history))
+        what = 'funds updated and recorded in nav_history'
+    elif case == 'new_schemes':
+        # With --error-rate some schemes fail and are left for retry_failed_schemes.
+        expected, done = new_schemes, len(database.funds) - schemes
+        what = 'new schemes added'
+        if error_rate and done > 0:
+            return None
+    else:
+        expected, done = schemes, len(database.funds)
+        what = 'funds inserted'
+    if done != expected:
+        return f"{done} of {expected} {what}"
+    return None
+
+
+def run_case(case, schemes, new_schemes, latency, error_rate, repeat):
+    """Run one case in this process and return its metrics (best of `repeat` runs)."""
+    workdir = tempfile.mkdtemp(prefix='bench_ingest_')
+    os.chdir(workdir)  # test.py writes logs/ and the NAVAll cache relative to the cwd
+    os.environ['RUPYA_NAV_SNAPSHOT'] = os.path.join(workdir, 'cache', 'nav_snapshot.bin')
+
+    import fake_mysql
+    import navall
+    import test as ingest
+    from stub_amfi import StubAMFIServer, scheme_codes
+
+    logging.disable(logging.INFO)
+    server = StubAMFIServer(scheme_count=schemes + new_schemes, latency=latency, error_rate=error_rate).start()
+    ingest.download_navall = functools.partial(
+        navall.download_navall, url=f"{server.base_url}/spages/NAVAll.txt", cache_dir=os.path.join(workdir, 'cache'))
+    ingest.new_mftool = lambda: StubMftool(server.base_url)
+
+    codes = scheme_codes(schemes + new_schemes)
+    best = None
+    problems = []
+    try:
+        # new_schemes is dominated by per-scheme requests and sleeps, so one run is representative.
+        for _ in range(1 if case == 'new_schemes' else repeat):
+            database = fake_mysql.FakeDatabase()
+            ingest.create_database_connection = lambda *args, **kwargs: database.connect()
+            if case == 'update':
+                fake_mysql.seed_funds(database, codes)
+                work = len(codes)
+                started = time.perf_counter()
+                ingest.update_mutual_fund_data()
+            elif case == 'new_schemes':
+                fake_mysql.seed_funds(database, codes[:schemes])
+                work = new_schemes
+                started = time.perf_counter()
+                ingest.check_and_add_new_schemes()
+            else:
+                rows = [(f"Scheme {code}", code, 'Equity Scheme - Large Cap Fund', 10.5, '2026-01-01 00:00:00')
+                        for code in codes[:schemes]]
+                work = len(rows)
+                started = time.perf_counter()
+                connection = database.connect()
+                for i in range(0, len(rows), 1000):
+                    ingest.insert_or_update_fund(connection, rows[i:i + 1000])
+            elapsed = time.perf_counter() - started
+            problem = check_work(case, database, codes, schemes, new_schemes, error_rate)
+            if problem:
+                problems.append(problem)
+            if best is None or elapsed < best[0]:
+                best = (elapsed, work, database.rows_written)
+    finally:
+        server.stop()
+
+    elapsed, work, rows_written = best
+    return {
+        'case': case,
+        'schemes': schemes,
+        'seconds': round(elapsed, 3),
+        'schemes_per_second': round(work / elapsed, 1),
+        'rows_per_second': round(rows_written / elapsed, 1),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'requests': server.request_count,
+        'problems': problems,
+    }
+
+
+def run_in_subprocess(case, schemes, args):
+    command = [sys.executable, os.path.abspath(__file__), '--run-case', case, '--schemes', str(schemes),
+               '--new-schemes', str(args.new_schemes), '--latency', str(args.latency),
+               '--error-rate', str(args.error_rate), '--repeat', str(args.repeat)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(result, baseline, tolerance):
+    """Regression messages for one result against its baseline entry."""
+    problems = []
+    throughput_metrics = ('schemes_per_second', 'rows_per_second')
+    if baseline.get('seconds', 0) < MIN_COMPARABLE_SECONDS:
+        throughput_metrics = ()
+    for metric in throughput_metrics:
+        expected = baseline.get(metric)
+        if expected and result[metric] < expected * (1 - tolerance):
+            problems.append(f"{metric} {result[metric]} < baseline {expected}")
+    expected = baseline.get('peak_rss_mb')
+    if expected and result['peak_rss_mb'] > expected * (1 + tolerance):
+        problems.append(f"peak_rss_mb {result['peak_rss_mb']} > baseline {expected}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--schemes', type=int, nargs='+', default=[1000, 5000, 20000, 50000])
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=list(CASES))
+    parser.add_argument('--new-schemes', type=int, default=200,
+                        help='schemes missing from the database in the new_schemes case')
+    parser.add_argument('--latency', type=float, default=0.0, help='stub response latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of stub responses that are 503')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case; the fastest is reported')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--run-case', choices=CASES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.schemes[0], args.new_schemes, args.latency,
+                                  args.error_rate, args.repeat)))
+        return 0
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+
+    results = {}
+    failures = []
+    print(f"{'case':<12} {'schemes':>8} {'seconds':>9} {'schemes/s':>11} {'rows/s':>11} {'peak RSS':>10}")
+    for case in args.cases:
+        for schemes in args.schemes:
+            result = run_in_subprocess(case, schemes, args)
+            key = f"{case}:{schemes}"
+            results[key] = result
+            failed = result.pop('problems')
+            problems = [] if args.save_baseline else compare(result, baseline.get(key, {}), args.tolerance)
+            failures += [f"{key}: {problem}" for problem in failed + problems]
+            print(f"{case:<12} {schemes:>8} {result['seconds']:>9.2f} {result['schemes_per_second']:>11.1f} "
+                  f"{result['rows_per_second']:>11.1f} {result['peak_rss_mb']:>8.1f}MB"
+                  f"{'  FAILED' if failed else '  REGRESSION' if problems else ''}")
+
+    if args.save_baseline and failures:
+        for failure in failures:
+            print(failure)
+        print("Not saving a baseline from failed runs")
+        return 1
+    if args.save_baseline:
+        baseline.update(results)
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {BASELINE_PATH}")
+        return 0
+
+    for failure in failures:
+        print(failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Measure /login throughput and latency under concurrent load on a SQLite-backed app.
+
+    python benchmarks/bench_login.py --users 200 --clients 16 --duration 10 --rounds 12
+    python benchmarks/bench_login.py --inline    # hash in the request thread for comparison
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--clients', type=int, default=16, help='concurrent login clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of load')
+    parser.add_argument('--rounds', type=int, default=12, help='bcrypt work factor')
+    parser.add_argument('--workers', type=int, default=None, help='hashing processes (default: app setting)')
+    parser.add_argument('--inline', action='store_true', help='hash in the request thread (workers=0)')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_login.db')
+    os.environ['RUPYA_DATABASE_URI'] = f"sqlite:///{db_path}"
+
+    import logging
+    import requests
+    from werkzeug.serving import make_server
+    from backend import app, db, User
+    from passwords import configure_hashing, hash_password
+
+    logging.disable(logging.CRITICAL)
+    app.config['BCRYPT_LOG_ROUNDS'] = args.rounds
+    if args.inline:
+        configure_hashing(0)
+    elif args.workers is not None:
+        configure_hashing(args.workers)
+
+    with app.app_context():
+        db.create_all()
+        password_hash = hash_password('benchmark-password', args.rounds)
+        db.session.add_all([
+            User(username=f"user{i}", email=f"user{i}@example.com", password_hash=password_hash)
+            for i in range(args.users)
+        ])
+        db.session.commit()
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/login"
+
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def client():
+        session = requests.Session()
+        local_latencies = []
+        local_failures = 0
+        while time.perf_counter() < deadline:
+            form = {'username': f"user{random.randrange(args.users)}", 'password': 'benchmark-password'}
+            started = time.perf_counter()
+            response = session.post(url, data=form, allow_redirects=False)
+            local_latencies.append(time.perf_counter() - started)
+            if response.status_code != 302:
+                local_failures += 1
+            session.cookies.clear()
+        with lock:
+            latencies.extend(local_latencies)
+            failures.append(local_failures)
+
+    threads = [threading.Thread(target=client) for _ in range(args.clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    mode = 'inline' if args.inline else 'process pool'
+    print(f"{mode}, cost {args.rounds}, {args.clients} clients: {len(latencies)} logins in {elapsed:.1f}s "
+          f"= {len(latencies) / elapsed:.1f} logins/s, {sum(failures)} failed")
+    print(f"latency p50 {percentile(latencies, 0.50) * 1000:.0f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
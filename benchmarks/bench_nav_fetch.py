@@ -0,0 +1,65 @@
+"""Compare the old serial NAV loop with the concurrent NavFetcher against the stub server.
+
+    python benchmarks/bench_nav_fetch.py --schemes 2000 --latency 0.02 --workers 16 --rate 500
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'mainapp')]
+
+import requests  # noqa: E402
+
+from nav_fetcher import NavFetcher  # noqa: E402
+from stub_amfi import StubAMFIServer, scheme_codes  # noqa: E402
+
+
+def serial_fetch(base_url, codes, pause_every=100, pause=1.0):
+    """The pre-NavFetcher loop: one request at a time, new connection each, sleeping every 100 schemes."""
+    data = []
+    for index, code in enumerate(codes, 1):
+        try:
+            payload = requests.get(f"{base_url}/mf/{code}/latest", timeout=10).json()
+            latest = payload['data'][0]
+            data.append((float(latest['nav']), latest['date'], code))
+        except Exception:
+            pass
+        if pause and index % pause_every == 0:
+            time.sleep(pause)
+    return data
+
+
+def run(label, fn):
+    start = time.perf_counter()
+    rows = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {len(rows):>7} rows  {elapsed:8.2f}s  {len(rows) / elapsed:10.1f} schemes/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--schemes', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--rate', type=float, default=500)
+    parser.add_argument('--no-pause', action='store_true', help='drop the serial loop\'s sleep(1) every 100 schemes')
+    args = parser.parse_args()
+
+    server = StubAMFIServer(scheme_count=args.schemes, latency=args.latency, error_rate=args.error_rate).start()
+    codes = scheme_codes(args.schemes)
+    try:
+        serial = run('serial', lambda: serial_fetch(server.base_url, codes, pause=0 if args.no_pause else 1.0))
+        with NavFetcher(base_url=f"{server.base_url}/mf", max_workers=args.workers,
+                        rate=args.rate, burst=args.workers) as fetcher:
+            concurrent = run('concurrent', lambda: fetcher.fetch_nav_data(codes))
+        print(f"speedup: {serial / concurrent:.1f}x")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
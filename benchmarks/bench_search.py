@@ -0,0 +1,96 @@
+"""Fund search latency benchmark on a synthetic set of AMFI-like scheme names.
+
+    python benchmarks/bench_search.py                 # 40k funds
+    python benchmarks/bench_search.py --funds 80000
+
+Reports index build time and per-query latency percentiles for autocomplete-style
+prefixes, full names, fund codes, category filters and misspellings. "cold" is the
+first time a query is seen, "cached" is a repeat answered from the result cache.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT]
+
+from fund_search import FundSearchIndex
+
+AMCS = ['SBI', 'HDFC', 'ICICI Prudential', 'Axis', 'Kotak Mahindra', 'Nippon India', 'Aditya Birla Sun Life',
+        'UTI', 'DSP', 'Mirae Asset', 'Tata', 'Franklin India', 'Parag Parikh', 'Motilal Oswal', 'Quant',
+        'Edelweiss', 'Invesco India', 'Canara Robeco', 'Bandhan', 'PGIM India']
+STYLES = ['Bluechip', 'Flexi Cap', 'Small Cap', 'Mid Cap', 'Large & Mid Cap', 'Focused', 'Value', 'ELSS Tax Saver',
+          'Banking & PSU Debt', 'Corporate Bond', 'Liquid', 'Overnight', 'Gilt', 'Balanced Advantage',
+          'Equity Savings', 'Nifty 50 Index', 'Nifty Next 50 Index', 'Arbitrage', 'Dynamic Bond', 'Multi Asset']
+PLANS = ['Direct Plan', 'Regular Plan']
+OPTIONS = ['Growth', 'IDCW', 'IDCW Reinvestment', 'Bonus']
+CATEGORIES = {
+    'Bluechip': 'Equity Scheme - Large Cap Fund', 'Flexi Cap': 'Equity Scheme - Flexi Cap Fund',
+    'Small Cap': 'Equity Scheme - Small Cap Fund', 'Mid Cap': 'Equity Scheme - Mid Cap Fund',
+    'Large & Mid Cap': 'Equity Scheme - Large & Mid Cap Fund', 'Focused': 'Equity Scheme - Focused Fund',
+    'Value': 'Equity Scheme - Value Fund', 'ELSS Tax Saver': 'Equity Scheme - ELSS',
+    'Banking & PSU Debt': 'Debt Scheme - Banking and PSU Fund', 'Corporate Bond': 'Debt Scheme - Corporate Bond Fund',
+    'Liquid': 'Debt Scheme - Liquid Fund', 'Overnight': 'Debt Scheme - Overnight Fund',
+    'Gilt': 'Debt Scheme - Gilt Fund', 'Balanced Advantage': 'Hybrid Scheme - Balanced Advantage',
+    'Equity Savings': 'Hybrid Scheme - Equity Savings', 'Nifty 50 Index': 'Other Scheme - Index Funds',
+    'Nifty Next 50 Index': 'Other Scheme - Index Funds', 'Arbitrage': 'Hybrid Scheme - Arbitrage Fund',
+    'Dynamic Bond': 'Debt Scheme - Dynamic Bond', 'Multi Asset': 'Hybrid Scheme - Multi Asset Allocation',
+}
+
+
+def synthetic_funds(count, seed=7):
+    rng = random.Random(seed)
+    for fund_id in range(1, count + 1):
+        style = rng.choice(STYLES)
+        series = f" Series {rng.randint(1, 40)}" if rng.random() < 0.3 else ''
+        name = f"{rng.choice(AMCS)} {style} Fund{series} - {rng.choice(PLANS)} - {rng.choice(OPTIONS)}"
+        yield fund_id, str(100000 + fund_id), name, CATEGORIES[style]
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--funds', type=int, default=40000)
+    parser.add_argument('--queries', type=int, default=2000, help='queries per workload')
+    args = parser.parse_args()
+
+    funds = list(synthetic_funds(args.funds))
+    index = FundSearchIndex()
+    started = time.perf_counter()
+    index.rebuild(funds)
+    print(f"built index for {len(index)} funds in {time.perf_counter() - started:.2f}s")
+
+    rng = random.Random(11)
+    names = [name for _, _, name, _ in funds]
+    workloads = {
+        'prefix': lambda: (names[rng.randrange(len(names))][:rng.randint(2, 8)], None),
+        'two words': lambda: (' '.join(names[rng.randrange(len(names))].split()[:2]), None),
+        'full name': lambda: (names[rng.randrange(len(names))], None),
+        'fund code': lambda: (str(100000 + rng.randint(1, args.funds)), None),
+        'category': lambda: (rng.choice(AMCS).split()[0][:3], 'Debt Scheme'),
+        'misspelt': lambda: (rng.choice(['bluchip', 'flexicap', 'smal cap', 'mirae asst', 'nifty50']), None),
+    }
+
+    print(f"{'workload':<12} {'cold p50':>9} {'cold p99':>9} {'cached p50':>11} {'repeats':>8}   (ms)")
+    for label, make_query in workloads.items():
+        seen = set()
+        cold, cached = [], []
+        for _ in range(args.queries):
+            query, category = make_query()
+            started = time.perf_counter()
+            index.search(query, category=category)
+            elapsed = (time.perf_counter() - started) * 1000
+            (cached if (query, category) in seen else cold).append(elapsed)
+            seen.add((query, category))
+        print(f"{label:<12} {percentile(cold, 0.5):>9.3f} {percentile(cold, 0.99):>9.3f} "
+              f"{percentile(cached or [0.0], 0.5):>11.3f} {len(cached):>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Ingest startup benchmark: how long the ingest takes to import before it does any work.
+
+Imports each ingest entry module in a fresh interpreter, best of --repeat, and checks
+that none of the web app or the heavy optional dependencies came along:
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --save-baseline     # record the current numbers
+
+Exits non-zero when an import gets slower than the baseline by more than --tolerance
+(plus --slack, since a few ms either way is scheduler noise) or pulls in a forbidden module.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+BASELINE_PATH = os.path.join(BENCH_DIR, 'startup_baseline.json')
+TARGETS = {
+    'ingest': 'ingest',  # mainapp/ingest.py, the CLI entry point
+    'jobs': 'test',  # mainapp/test.py, imported by every ingest command and ingest_worker.py
+    'models': 'models',  # shared table definitions
+}
+# Modules the ingest must not import at startup: the web app, and dependencies that
+# only a few jobs need (mftool alone pulls in pandas, yfinance and matplotlib).
+FORBIDDEN = ('backend', 'flask', 'flask_sqlalchemy', 'flask_login', 'mftool', 'pandas', 'numpy', 'yfinance',
+             'matplotlib', 'schedule', 'pytz')
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - started
+print(json.dumps({{'seconds': seconds, 'modules': len(sys.modules),
+                  'forbidden': sorted(m for m in {forbidden!r} if m in sys.modules)}}))
+"""
+
+
+def measure(module, repeat):
+    """Best-of-`repeat` import time and process wall time for one module, each in a new interpreter."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.path.join(ROOT, 'mainapp')]))
+    workdir = tempfile.mkdtemp(prefix='bench_startup_')  # test.py creates logs/ in the cwd
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', PROBE.format(module=module, forbidden=FORBIDDEN)],
+                                check=True, capture_output=True, text=True, cwd=workdir, env=env).stdout
+        wall = time.perf_counter() - started
+        result = json.loads(output.strip().splitlines()[-1])
+        result['wall_seconds'] = wall
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return {
+        'import_seconds': round(best['seconds'], 3),
+        'wall_seconds': round(best['wall_seconds'], 3),
+        'modules': best['modules'],
+        'forbidden': best['forbidden'],
+    }
+
+
+def compare(result, baseline, tolerance, slack):
+    problems = []
+    if result['forbidden']:
+        problems.append(f"imports {', '.join(result['forbidden'])}")
+    expected = baseline.get('import_seconds')
+    if expected and result['import_seconds'] > expected * (1 + tolerance) + slack:
+        problems.append(f"import_seconds {result['import_seconds']} > baseline {expected}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--targets', nargs='+', choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument('--repeat', type=int, default=5, help='interpreters per target; the fastest is reported')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--slack', type=float, default=0.02, help='seconds allowed on top of --tolerance')
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+
+    results = {}
+    failures = []
+    print(f"{'target':<8} {'import':>9} {'process':>9} {'modules':>8}")
+    for target in args.targets:
+        result = results[target] = measure(TARGETS[target], args.repeat)
+        problems = compare(result, {} if args.save_baseline else baseline.get(target, {}),
+                           args.tolerance, args.slack)
+        failures += [f"{target}: {problem}" for problem in problems]
+        print(f"{target:<8} {result['import_seconds'] * 1000:>7.0f}ms {result['wall_seconds'] * 1000:>7.0f}ms "
+              f"{result['modules']:>8}{'  REGRESSION' if problems else ''}")
+
+    if args.save_baseline and not failures:
+        baseline.update(results)
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {BASELINE_PATH}")
+        return 0
+
+    for failure in failures:
+        print(failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
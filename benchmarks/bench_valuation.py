@@ -0,0 +1,64 @@
+"""Time value_portfolios (valuation + XIRR) on synthetic SIP transactions.
+
+    python benchmarks/bench_valuation.py --transactions 2000000 --users 100000 --funds 5000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+from valuation import to_days, value_portfolios  # noqa: E402
+
+
+def synthetic_transactions(n_transactions, n_users, n_funds, seed=7):
+    rng = np.random.default_rng(seed)
+    start = to_days([date(2019, 1, 1)])[0]
+    end = to_days([date.today()])[0]
+    amount = rng.choice([500.0, 1000.0, 2000.0, 5000.0], n_transactions)
+    nav_on_purchase = rng.uniform(10, 500, n_transactions)
+    user_id = rng.integers(1, n_users + 1, n_transactions)
+    # Each user runs SIPs in a handful of funds rather than a random fund per instalment.
+    fund_id = (user_id * 7919 + rng.integers(0, 5, n_transactions)) % n_funds + 1
+    return {
+        'user_id': user_id,
+        'fund_id': fund_id,
+        'day': rng.integers(start, end, n_transactions),
+        'amount': amount,
+        'units': amount / nav_on_purchase,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transactions', type=int, default=2000000)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--funds', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    transactions = synthetic_transactions(args.transactions, args.users, args.funds)
+    nav_fund_ids = np.arange(1, args.funds + 1)
+    navs = np.random.default_rng(11).uniform(10, 600, args.funds)
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        result = value_portfolios(transactions, nav_fund_ids, navs)
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    converged = np.isfinite(result['xirr']).mean() * 100
+    print(f"{args.transactions} transactions, {len(result['fund_id'])} holdings, "
+          f"{len(result['users']['user_id'])} users")
+    print(f"best of {args.repeat}: {best:.2f}s ({args.transactions / best:,.0f} transactions/s), "
+          f"XIRR converged for {converged:.1f}% of holdings")
+
+
+if __name__ == '__main__':
+    main()
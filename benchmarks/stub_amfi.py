@@ -0,0 +1,180 @@
+"""Local stand-in for the AMFI / mfapi endpoints used by the ingest jobs.
+
+Serves deterministic synthetic data so fetch throughput can be measured without
+touching the real services:
+
+    GET /mf/<code>          NAV history for one scheme (mfapi format, newest first)
+    GET /mf/<code>/latest   latest NAV for one scheme (mfapi format)
+    GET /spages/NAVAll.txt  bulk NAV file, honouring If-None-Match / If-Modified-Since
+
+Run standalone with ``python benchmarks/stub_amfi.py --port 8765 --latency 0.02``.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIRST_SCHEME_CODE = 100000
+
+
+def scheme_codes(count):
+    return [str(FIRST_SCHEME_CODE + i) for i in range(count)]
+
+
+def synthetic_nav(code, day_offset=0):
+    code = int(code)
+    return round(10 + (code % 997) / 7 + day_offset * 0.01 * ((code % 3) - 1), 4)
+
+
+def synthetic_scheme(code):
+    code = int(code)
+    return {
+        'scheme_code': code,
+        'scheme_name': f"Stub AMC Scheme {code} - Direct Plan - Growth",
+        'scheme_category': ('Equity Scheme - Large Cap Fund', 'Debt Scheme - Liquid Fund',
+                            'Hybrid Scheme - Balanced Advantage')[code % 3],
+        'fund_house': f"Stub AMC {code % 40}",
+    }
+
+
+class StubAMFIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so client-side connection reuse is measurable
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type='application/json', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        with server.lock:
+            server.request_count += 1
+        if server.error_rate and random.random() < server.error_rate:
+            self.send_body(503, b'{"status": "ERROR"}')
+            return
+
+        parts = [part for part in self.path.split('?')[0].split('/') if part]
+        if len(parts) == 3 and parts[0] == 'mf' and parts[2] == 'latest' and parts[1].isdigit():
+            self.send_latest(parts[1])
+        elif len(parts) == 2 and parts[0] == 'mf' and parts[1].isdigit():
+            self.send_history(parts[1])
+        elif parts == ['spages', 'NAVAll.txt']:
+            self.send_navall()
+        else:
+            self.send_body(404, b'{"status": "ERROR"}')
+
+    def send_latest(self, code):
+        today = self.server.nav_date
+        payload = {
+            'meta': synthetic_scheme(code),
+            'data': [{'date': today.strftime('%d-%m-%Y'), 'nav': f"{synthetic_nav(code):.5f}"}],
+            'status': 'SUCCESS',
+        }
+        self.send_body(200, json.dumps(payload).encode('utf-8'))
+
+    def send_history(self, code):
+        today = self.server.nav_date
+        payload = {
+            'meta': synthetic_scheme(code),
+            'data': [
+                {'date': (today - timedelta(days=offset)).strftime('%d-%m-%Y'),
+                 'nav': f"{synthetic_nav(code, -offset):.5f}"}
+                for offset in range(self.server.history_days)
+            ],
+            'status': 'SUCCESS',
+        }
+        self.send_body(200, json.dumps(payload).encode('utf-8'))
+
+    def send_navall(self):
+        body, etag, last_modified = self.server.navall()
+        if self.headers.get('If-None-Match') == etag or self.headers.get('If-Modified-Since') == last_modified:
+            self.send_response(304)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_body(200, body, 'text/plain; charset=utf-8', {'ETag': etag, 'Last-Modified': last_modified})
+
+
+def build_navall(codes, nav_date):
+    lines = ['Scheme Code;ISIN Div Payout/ ISIN Growth;ISIN Div Reinvestment;Scheme Name;Net Asset Value;Date', '']
+    category = None
+    for code in codes:
+        scheme = synthetic_scheme(code)
+        if scheme['scheme_category'] != category:
+            category = scheme['scheme_category']
+            lines += [f"Open Ended Schemes({category})", '', scheme['fund_house'], '']
+        lines.append(f"{code};INF{code}01;-;{scheme['scheme_name']};{synthetic_nav(code):.4f};"
+                     f"{nav_date.strftime('%d-%b-%Y')}")
+    return ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+
+
+class StubAMFIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), scheme_count=1000, latency=0.0, error_rate=0.0,
+                 history_days=365):
+        super().__init__(address, StubAMFIHandler)
+        self.scheme_count = scheme_count
+        self.history_days = history_days
+        self.latency = latency
+        self.error_rate = error_rate
+        self.nav_date = date.today() - timedelta(days=1)
+        self.request_count = 0
+        self.lock = threading.Lock()
+        self._navall = None
+
+    def navall(self):
+        with self.lock:
+            if self._navall is None:
+                body = build_navall(scheme_codes(self.scheme_count), self.nav_date)
+                self._navall = (body, f'"{self.scheme_count}-{self.nav_date.isoformat()}"',
+                                formatdate(time.time(), usegmt=True))
+            return self._navall
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--schemes', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    args = parser.parse_args()
+
+    server = StubAMFIServer(('127.0.0.1', args.port), args.schemes, args.latency, args.error_rate)
+    print(f"Stub AMFI server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+import bisect
+import logging
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+FUZZY_MIN_SIMILARITY = 0.5  # share of a misspelt word's trigrams an indexed word must contain
+FUZZY_MAX_WORDS = 5  # indexed words a misspelt query word may expand to
+PREFIX_CACHE_SIZE = 512  # merged posting sets kept per word index
+RESULT_CACHE_SIZE = 4096  # autocomplete sends the same few thousand prefixes all day
+RESULT_CACHE_TTL = 24 * 3600  # results are also dropped whenever the index changes
+
+FundDoc = namedtuple('FundDoc', ['fund_id', 'fund_code', 'fund_name', 'category'])
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+_EMPTY = frozenset()
+
+
+def normalize(text):
+    return _NON_ALNUM.sub(' ', (text or '').lower()).strip()
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class WordIndex:
+    """Word -> set of ordinals, with prefix lookups over a sorted vocabulary."""
+
+    def __init__(self):
+        self.postings = {}
+        self.vocabulary = []
+        self._prefix_cache = OrderedDict()
+
+    def add(self, word, ordinal):
+        posting = self.postings.get(word)
+        if posting is None:
+            posting = self.postings[word] = set()
+            bisect.insort(self.vocabulary, word)
+        posting.add(ordinal)
+        self._prefix_cache.clear()
+
+    def discard(self, word, ordinal):
+        self.postings[word].discard(ordinal)
+        self._prefix_cache.clear()
+
+    def words_with_prefix(self, prefix):
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + '\uffff')
+        return self.vocabulary[start:end]
+
+    def prefix(self, prefix):
+        ids = self._prefix_cache.get(prefix)
+        if ids is not None:
+            self._prefix_cache.move_to_end(prefix)
+            return ids
+        postings = [self.postings[word] for word in self.words_with_prefix(prefix)]
+        if len(postings) == 1:
+            return postings[0]
+        # Merging is the expensive step ("fund" + "funds", or every word under "s"), and the
+        # same prefixes come back on every keystroke, so merged sets are kept in an LRU.
+        ids = set().union(*postings)
+        self._prefix_cache[prefix] = ids
+        if len(self._prefix_cache) > PREFIX_CACHE_SIZE:
+            self._prefix_cache.popitem(last=False)
+        return ids
+
+
+class FundSearchIndex:
+    """In-memory prefix index over mutual fund names, codes and categories.
+
+    A fund matches when every query word is a prefix of one of its words. Funds are
+    numbered by a static rank (shorter names first) when the index is built, so ranking
+    is set arithmetic plus a heap over plain ints; no per-candidate scoring runs in
+    Python. Query words that prefix nothing are treated as misspellings and expanded to
+    the indexed words with the most trigrams in common.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._results = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+        self._reset()
+        self.version = None  # ingest_state NAV version the index was last built at
+        self.last_rebuilt = 0.0
+
+    def _reset(self):
+        self._docs = []  # ordinal -> FundDoc, in static rank order as of the last rebuild
+        self._ordinals = {}  # fund_id -> ordinal
+        self._codes = {}  # fund_code -> ordinal
+        self._words = WordIndex()
+        self._first_words = WordIndex()  # first word of each name, for "starts with" ranking
+        self._categories = {}  # lower-cased category -> set of ordinals
+        self._word_trigrams = {}  # trigram -> indexed words containing it
+        self._generation = getattr(self, '_generation', 0) + 1  # part of every result cache key
+
+    def __len__(self):
+        return len(self._ordinals)
+
+    def _words_of(self, doc):
+        return set(f"{normalize(doc.fund_name)} {normalize(doc.category)}".split()) | {doc.fund_code}
+
+    def add(self, rows):
+        """Add or replace funds from (fund_id, fund_code, fund_name, category) rows.
+
+        New funds rank after the existing ones until the next rebuild re-sorts everything.
+        """
+        added = 0
+        with self._lock:
+            for fund_id, fund_code, fund_name, category in rows:
+                doc = FundDoc(fund_id, str(fund_code), fund_name, category or '')
+                ordinal = self._ordinals.get(fund_id)
+                if ordinal is None:
+                    ordinal = self._ordinals[fund_id] = len(self._docs)
+                    self._docs.append(doc)
+                else:
+                    self._remove(ordinal)
+                    self._docs[ordinal] = doc
+                self._index(doc, ordinal)
+                added += 1
+            if added:
+                self._generation += 1
+        return added
+
+    def _index(self, doc, ordinal):
+        self._codes[doc.fund_code] = ordinal
+        for word in self._words_of(doc):
+            if word not in self._words.postings:
+                for trigram in trigrams(word):
+                    self._word_trigrams.setdefault(trigram, set()).add(word)
+            self._words.add(word, ordinal)
+        name_words = normalize(doc.fund_name).split()
+        if name_words:
+            self._first_words.add(name_words[0], ordinal)
+        self._categories.setdefault(doc.category.lower(), set()).add(ordinal)
+
+    def _remove(self, ordinal):
+        doc = self._docs[ordinal]
+        self._codes.pop(doc.fund_code, None)
+        for word in self._words_of(doc):
+            self._words.discard(word, ordinal)
+        name_words = normalize(doc.fund_name).split()
+        if name_words:
+            self._first_words.discard(name_words[0], ordinal)
+        self._categories[doc.category.lower()].discard(ordinal)
+
+    def rebuild(self, rows, version=None):
+        docs = sorted(rows, key=lambda row: (len(row[2] or ''), row[0]))
+        with self._lock:
+            self._reset()
+            count = self.add(docs)
+            self.version = version
+            self.last_rebuilt = time.monotonic()
+        logger.info(f"Fund search index built with {count} funds")
+        return count
+
+    def refresh(self, load_rows, version):
+        """Rebuild from load_rows() once the ingest has moved the NAV data version on.
+
+        Every ingest run that changes mutual_funds bumps that version, so new, renamed and
+        re-categorised funds all show up after the run. Cheap enough to call on every
+        request: once built, it only touches the database when the version changes.
+        """
+        if self.last_rebuilt and version == self.version:
+            return 0
+        with self._lock:
+            if self.last_rebuilt and version == self.version:
+                return 0
+            return self.rebuild(load_rows(), version)
+
+    def _similar_words(self, word):
+        word_trigrams = trigrams(word)
+        shared = Counter()
+        for trigram in word_trigrams:
+            shared.update(self._word_trigrams.get(trigram, ()))
+        needed = len(word_trigrams) * FUZZY_MIN_SIMILARITY
+        return [similar for similar, count in shared.most_common(FUZZY_MAX_WORDS) if count >= needed]
+
+    def _matching(self, word):
+        ids = self._words.prefix(word)
+        if not ids:
+            postings = [self._words.postings[similar] for similar in self._similar_words(word)]
+            ids = set().union(*postings)
+        return ids
+
+    def search(self, query, category=None, limit=SEARCH_DEFAULT_LIMIT):
+        """Return up to `limit` FundDocs ranked best first.
+
+        An exact fund code comes first, then funds whose name starts with the first query
+        word, then funds containing every query word as a whole word; the static rank breaks
+        ties. `category` keeps only funds whose category starts with it (e.g. 'Debt Scheme').
+        """
+        words = normalize(query).split()
+        if not words:
+            return []
+        key = (self._generation, ' '.join(words), query.strip(), (category or '').lower(), limit)
+        results = self._results.get(key)
+        if results is None:
+            results = self._search(query, words, category, limit)
+            self._results.set(key, results)
+        return results
+
+    def _search(self, query, words, category, limit):
+        with self._lock:
+            candidates = None
+            for word in sorted(words, key=len, reverse=True):  # longest word is usually the most selective
+                ids = self._matching(word)
+                candidates = ids if candidates is None else candidates & ids
+                if not candidates:
+                    return []
+
+            if category:
+                category_key = category.lower()
+                candidates = set().union(*(
+                    candidates & ordinals for name, ordinals in self._categories.items()
+                    if name.startswith(category_key)
+                ))
+
+            starts = candidates & self._first_words.prefix(words[0])
+            exact = candidates
+            for word in words:
+                exact = exact & self._words.postings.get(word, _EMPTY)
+
+            ranked = []
+            code_match = self._codes.get(query.strip())
+            if code_match in candidates:
+                ranked.append(code_match)
+            # Lower tiers are walked with the higher ones skipped rather than built as set differences.
+            tiers = ((starts & exact, ()), (starts, (exact,)), (exact, (starts,)), (candidates, (starts, exact)))
+            for tier, skip in tiers:
+                for ordinal in self._in_rank_order(tier, limit):
+                    if len(ranked) >= limit:
+                        break
+                    if ordinal != code_match and not any(ordinal in higher for higher in skip):
+                        ranked.append(ordinal)
+                if len(ranked) >= limit:
+                    break
+            return [self._docs[ordinal] for ordinal in ranked]
+
+    def _in_rank_order(self, ordinals, limit):
+        if not ordinals:
+            return iter(())
+        first, last = min(ordinals), max(ordinals)
+        if len(ordinals) * len(ordinals) > limit * (last - first):
+            # Dense sets: walking the rank range finds `limit` members after ~limit * span / len steps,
+            # far cheaper than sorting thousands of candidates to keep ten.
+            return filter(ordinals.__contains__, range(first, last + 1))
+        return iter(sorted(ordinals))
@@ -0,0 +1,113 @@
+import logging
+from decimal import Decimal, ROUND_HALF_UP
+
+from mysql.connector import Error
+
+logger = logging.getLogger(__name__)
+
+UNITS_QUANTUM = Decimal('0.0001')  # sip_transactions.units_allotted is DECIMAL(10, 4)
+
+APPLY_HOLDING_DELTA_QUERY = """
+    INSERT INTO portfolio_holdings (user_id, fund_id, total_units)
+    VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+    total_units = total_units + VALUES(total_units),
+    last_updated = CURRENT_TIMESTAMP
+"""
+
+HOLDINGS_DRIFT_QUERY = """
+    SELECT t.user_id, t.fund_id, t.units, h.total_units
+    FROM (
+        SELECT user_id, fund_id, SUM(COALESCE(units_allotted, 0)) AS units
+        FROM sip_transactions
+        GROUP BY user_id, fund_id
+    ) t
+    LEFT JOIN portfolio_holdings h ON h.user_id = t.user_id AND h.fund_id = t.fund_id
+    WHERE h.total_units IS NULL OR h.total_units <> t.units
+    UNION ALL
+    SELECT h.user_id, h.fund_id, 0, h.total_units
+    FROM portfolio_holdings h
+    WHERE NOT EXISTS (
+        SELECT 1 FROM sip_transactions t
+        WHERE t.user_id = h.user_id AND t.fund_id = h.fund_id
+    )
+"""
+
+
+def units_for(amount, nav_on_purchase):
+    return (Decimal(str(amount)) / Decimal(str(nav_on_purchase))).quantize(UNITS_QUANTUM, rounding=ROUND_HALF_UP)
+
+
+def apply_holding_deltas(cursor, deltas):
+    """Add (user_id, fund_id, units) deltas to portfolio_holdings in the caller's transaction."""
+    cursor.executemany(APPLY_HOLDING_DELTA_QUERY, deltas)
+
+
+def record_sip_transaction(connection, user_id, fund_id, amount, transaction_date, nav_on_purchase,
+                           units_allotted=None):
+    """Insert one SIP transaction and move the matching holding in the same DB transaction."""
+    if units_allotted is None:
+        units_allotted = units_for(amount, nav_on_purchase)
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            INSERT INTO sip_transactions
+            (user_id, fund_id, amount, transaction_date, nav_on_purchase, units_allotted)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (user_id, fund_id, amount, transaction_date, nav_on_purchase, units_allotted))
+        transaction_id = cursor.lastrowid
+        apply_holding_deltas(cursor, [(user_id, fund_id, units_allotted)])
+        connection.commit()
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return transaction_id
+
+
+def verify_holdings(connection):
+    """Holdings whose total_units disagree with SUM(units_allotted): [(user_id, fund_id, expected, actual)]."""
+    cursor = connection.cursor()
+    cursor.execute(HOLDINGS_DRIFT_QUERY)
+    drift = cursor.fetchall()
+    cursor.close()
+    return drift
+
+
+def rebuild_holdings(connection, verify_only=False):
+    """Report drift and, unless verify_only, recompute every holding from sip_transactions in one pass."""
+    drift = verify_holdings(connection)
+    for user_id, fund_id, expected, actual in drift[:20]:
+        logger.warning(f"Holding drift for user {user_id} fund {fund_id}: expected {expected}, found {actual}")
+    logger.info(f"Found {len(drift)} drifted holdings")
+    if verify_only or not drift:
+        return drift
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            INSERT INTO portfolio_holdings (user_id, fund_id, total_units)
+            SELECT user_id, fund_id, SUM(COALESCE(units_allotted, 0))
+            FROM sip_transactions
+            GROUP BY user_id, fund_id
+            ON DUPLICATE KEY UPDATE
+            total_units = VALUES(total_units),
+            last_updated = CURRENT_TIMESTAMP
+        """)
+        cursor.execute("""
+            DELETE h FROM portfolio_holdings h
+            WHERE NOT EXISTS (
+                SELECT 1 FROM sip_transactions t
+                WHERE t.user_id = h.user_id AND t.fund_id = h.fund_id
+            )
+        """)
+        connection.commit()
+        logger.info("Rebuilt portfolio_holdings from sip_transactions")
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return drift
@@ -0,0 +1,83 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 100
+BACKFILL_MAX_ATTEMPTS = 6
+BACKFILL_RETRY_DELAY = 3600  # seconds before the first retry; doubles with every failed attempt
+
+
+def create_backfill_table_if_not_exists(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS scheme_backfill (
+            scheme_code VARCHAR(20) PRIMARY KEY,
+            status ENUM('done', 'failed') NOT NULL,
+            attempts INT NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP NULL,
+            last_error VARCHAR(255),
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            INDEX idx_backfill_retry (status, next_attempt_at)
+        )
+    """)
+
+
+def get_attempted_scheme_codes(connection):
+    """Codes with a checkpoint row: finished, or waiting in the retry queue."""
+    cursor = connection.cursor()
+    cursor.execute("SELECT scheme_code FROM scheme_backfill")
+    scheme_codes = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return scheme_codes
+
+
+def get_due_retries(connection, max_attempts=BACKFILL_MAX_ATTEMPTS, limit=None):
+    """Failed codes whose backoff has elapsed and that still have attempts left."""
+    query = """
+        SELECT scheme_code FROM scheme_backfill
+        WHERE status = 'failed' AND attempts < %s
+        AND (next_attempt_at IS NULL OR next_attempt_at <= CURRENT_TIMESTAMP)
+        ORDER BY next_attempt_at
+    """
+    params = [max_attempts]
+    if limit:
+        query += " LIMIT %s"
+        params.append(limit)
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    scheme_codes = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return scheme_codes
+
+
+def record_backfill_progress(connection, done_codes, failures, retry_delay=BACKFILL_RETRY_DELAY):
+    """Checkpoint one batch: done codes are final, failures are queued with exponential backoff.
+
+    failures maps scheme code -> error message.
+    """
+    cursor = connection.cursor()
+    try:
+        if done_codes:
+            cursor.executemany("""
+                INSERT INTO scheme_backfill (scheme_code, status, attempts)
+                VALUES (%s, 'done', 1)
+                ON DUPLICATE KEY UPDATE
+                status = 'done',
+                attempts = attempts + 1,
+                next_attempt_at = NULL,
+                last_error = NULL
+            """, [(code,) for code in done_codes])
+        if failures:
+            # next_attempt_at is assigned before attempts so it sees the pre-increment count.
+            retry_delay = int(retry_delay)
+            cursor.executemany(f"""
+                INSERT INTO scheme_backfill (scheme_code, status, attempts, next_attempt_at, last_error)
+                VALUES (%s, 'failed', 1, CURRENT_TIMESTAMP + INTERVAL {retry_delay} SECOND, %s)
+                ON DUPLICATE KEY UPDATE
+                status = 'failed',
+                next_attempt_at = CURRENT_TIMESTAMP + INTERVAL ({retry_delay} * POW(2, attempts)) SECOND,
+                attempts = attempts + 1,
+                last_error = VALUES(last_error)
+            """, [(code, error[:255]) for code, error in failures.items()])
+        connection.commit()
+    finally:
+        cursor.close()
@@ -0,0 +1,50 @@
+"""Run one ingest job and exit, without the scheduler or the web app.
+
+    python ingest.py update                 # daily NAV update
+    python ingest.py new-schemes --limit 500
+    python ingest.py retry-schemes
+    python ingest.py sips
+    python ingest.py analytics
+    python ingest.py valuations
+    python ingest.py verify-holdings
+    python ingest.py schedule               # what `python test.py` does
+
+Nothing is imported until the command is known, and the jobs in test.py import their
+heavy dependencies (mftool, numpy, pytz, schedule) only when they run, so a cron or
+container start pays for the database layer and the one job it asked for.
+"""
+import argparse
+import sys
+
+COMMANDS = {
+    'update': 'update_mutual_fund_data',
+    'new-schemes': 'check_and_add_new_schemes',
+    'retry-schemes': 'retry_failed_schemes',
+    'sips': 'execute_sip_instalments',
+    'analytics': 'update_fund_analytics',
+    'valuations': 'update_portfolio_valuations',
+    'verify-holdings': 'verify_portfolio_holdings',
+    'schedule': 'run_scheduler',
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=list(COMMANDS))
+    parser.add_argument('--limit', type=int, help='new-schemes: schemes to add this run (default: all)')
+    parser.add_argument('--no-run-now', action='store_true', help='schedule: wait for the first scheduled run')
+    args = parser.parse_args()
+
+    import test as jobs
+    job = getattr(jobs, COMMANDS[args.command])
+    if args.command == 'new-schemes':
+        job(limit=args.limit)
+    elif args.command == 'schedule':
+        job(run_now=not args.no_run_now)
+    else:
+        job()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
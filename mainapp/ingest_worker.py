@@ -0,0 +1,235 @@
+"""Sharded ingest: a coordinator splits a job's scheme codes into shards, workers lease them.
+
+    python ingest_worker.py coordinator --job new_schemes --shards 32 --local-workers 4
+    python ingest_worker.py worker                      # on any machine, joins the newest open run
+    python ingest_worker.py worker --run-id new_schemes-20260101180000 --wait
+
+Shards live in the ingest_leases table. A worker claims one, processes its schemes in
+steps and renews the lease with a checkpoint after every step, while a heartbeat thread
+keeps the lease alive during a step; if it dies the lease expires and another worker
+resumes the shard from the checkpoint.
+"""
+import argparse
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from mysql.connector import Error
+
+from db import bump_data_version, create_database_connection
+from leases import (LeaseHeartbeat, LeaseLost, claim_shard, complete_shard, create_run, latest_open_run,
+                    renew_lease, run_progress, shard_of)
+from metrics import write_metrics
+from nav_fetcher import NavFetcher
+from nav_history import backfill_nav_history, get_fund_ids_by_code
+from test import (BACKFILL_BATCH_SIZE, backfill_schemes, create_backfill_table_if_not_exists, download_navall,
+                  get_attempted_scheme_codes, get_existing_scheme_codes, new_mftool, publish_navs, read_navall)
+
+logger = logging.getLogger(__name__)
+
+REPORT_INTERVAL = 10  # seconds between coordinator progress lines
+IDLE_POLL_INTERVAL = 15  # seconds a --wait worker sleeps while other workers hold every shard
+
+
+class NewSchemesJob:
+    """check_and_add_new_schemes, split by scheme code; scheme_backfill checkpoints each scheme."""
+
+    step = BACKFILL_BATCH_SIZE
+
+    def __init__(self):
+        self.mf = new_mftool()
+
+    def scheme_codes(self, connection):
+        cursor = connection.cursor()
+        create_backfill_table_if_not_exists(cursor)
+        cursor.close()
+        navall_path, _ = download_navall()
+        all_scheme_codes = {record.fund_code for record in read_navall(navall_path)}
+        return all_scheme_codes - set(get_existing_scheme_codes(connection)) - get_attempted_scheme_codes(connection)
+
+    def process(self, connection, scheme_codes, check=None):
+        return backfill_schemes(connection, self.mf, scheme_codes, check=check)
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def finish(connection, progress):
+        # Once per run, in the coordinator: every bump empties the web workers' NAV caches.
+        if progress['schemes_done']:
+            bump_data_version(connection)
+            publish_navs(connection)
+
+
+class NavHistoryJob:
+    """backfill_nav_history, split by scheme code."""
+
+    step = 50
+
+    def __init__(self):
+        self.fetcher = NavFetcher()
+
+    def scheme_codes(self, connection):
+        return set(get_fund_ids_by_code(connection))
+
+    def process(self, connection, scheme_codes, check=None):
+        failures = {}
+        backfill_nav_history(connection, scheme_codes, fetcher=self.fetcher, check=check, failures=failures)
+        return len(scheme_codes) - len(failures), len(failures)
+
+    def close(self):
+        self.fetcher.close()
+
+    @staticmethod
+    def finish(connection, progress):
+        pass
+
+
+JOBS = {
+    'new_schemes': NewSchemesJob,
+    'nav_history': NavHistoryJob,
+}
+
+
+def process_shard(connection, lease, job, scheme_codes):
+    """Work through one leased shard from its checkpoint, renewing the lease after every step.
+
+    The job checks the heartbeat before every scheme and every write, so a step whose
+    lease was lost stops instead of racing the worker that took the shard over.
+    """
+    codes = sorted(
+        code for code in scheme_codes
+        if shard_of(code, lease.shard_count) == lease.shard
+        and (lease.checkpoint is None or code > lease.checkpoint)
+    )
+    logger.info(f"Shard {lease.shard}/{lease.shard_count}: {len(codes)} schemes to process")
+    heartbeat_connection = create_database_connection()
+    if not heartbeat_connection:
+        raise Error("Failed to connect to the database for the lease heartbeat")
+    try:
+        with LeaseHeartbeat(heartbeat_connection, lease) as heartbeat:
+            for i in range(0, len(codes), job.step):
+                step_codes = codes[i:i + job.step]
+                done, failed = job.process(connection, step_codes, check=heartbeat.check)
+                heartbeat.check()
+                lease = renew_lease(connection, lease, step_codes[-1], done, failed)
+            complete_shard(connection, lease)
+    finally:
+        heartbeat_connection.close()
+
+
+def run_worker(run_id=None, worker_id=None, wait=False):
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    connection = create_database_connection()
+    if not connection:
+        logger.error("Failed to connect to the database")
+        return 1
+
+    jobs = {}
+    scheme_codes = {}
+    shards = 0
+    try:
+        run_id = run_id or latest_open_run(connection)
+        if run_id is None:
+            logger.info("No open ingest run")
+            return 0
+        logger.info(f"Worker {worker_id} joining {run_id}")
+        while True:
+            lease = claim_shard(connection, run_id, worker_id)
+            if lease is None:
+                progress = run_progress(connection, run_id)
+                if not wait or progress['done'] == progress['shards']:
+                    break
+                time.sleep(IDLE_POLL_INTERVAL)  # expired leases become claimable without a restart
+                continue
+            if lease.job not in jobs:
+                jobs[lease.job] = JOBS[lease.job]()
+            if lease.job not in scheme_codes or lease.attempts > 1:
+                # Computed once per worker, since shards own disjoint codes. A taken-over shard
+                # reloads it: the previous owner may have finished schemes past its last checkpoint.
+                scheme_codes[lease.job] = jobs[lease.job].scheme_codes(connection)
+            try:
+                process_shard(connection, lease, jobs[lease.job], scheme_codes[lease.job])
+                shards += 1
+            except LeaseLost as e:
+                logger.warning(f"{e}; moving on")
+    except Error as e:
+        logger.error(f"Database error: {e}")
+        return 1
+    finally:
+        for job in jobs.values():
+            job.close()
+        connection.close()
+        write_metrics(f"metrics/ingest_worker_{os.getpid()}.prom")
+    logger.info(f"Worker {worker_id} finished {shards} shards of {run_id}")
+    return 0
+
+
+def run_coordinator(job, shard_count, local_workers=0, interval=REPORT_INTERVAL):
+    """Create a run, optionally start local workers, and report progress until every shard is done."""
+    connection = create_database_connection()
+    if not connection:
+        logger.error("Failed to connect to the database")
+        return 1
+
+    run_id = f"{job}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    processes = []
+    try:
+        create_run(connection, run_id, job, shard_count)
+        for _ in range(local_workers):
+            processes.append(subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), 'worker', '--run-id', run_id, '--wait']))
+
+        started = time.monotonic()
+        while True:
+            progress = run_progress(connection, run_id)
+            elapsed = time.monotonic() - started
+            rate = (progress['schemes_done'] + progress['schemes_failed']) / elapsed if elapsed else 0.0
+            logger.info(f"{run_id}: {progress['done']}/{progress['shards']} shards done, "
+                        f"{progress['leased']} leased by {progress['workers']} workers, "
+                        f"{progress['expired']} expired, {progress['pending']} pending; "
+                        f"{progress['schemes_done']} schemes done, {progress['schemes_failed']} failed "
+                        f"({rate:.1f}/s)")
+            if progress['done'] == progress['shards']:
+                JOBS[job].finish(connection, progress)
+                break
+            if processes and all(process.poll() is not None for process in processes) and not progress['leased']:
+                logger.error("All local workers exited before the run finished")
+                return 1
+            time.sleep(interval)
+    except Error as e:
+        logger.error(f"Database error: {e}")
+        return 1
+    finally:
+        connection.close()
+        for process in processes:
+            process.wait()
+    logger.info(f"Run {run_id} finished in {time.monotonic() - started:.0f}s")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    coordinator = commands.add_parser('coordinator', help='create a run and report its progress')
+    coordinator.add_argument('--job', choices=sorted(JOBS), default='new_schemes')
+    coordinator.add_argument('--shards', type=int, default=32)
+    coordinator.add_argument('--local-workers', type=int, default=0, help='worker processes to start on this host')
+    coordinator.add_argument('--interval', type=float, default=REPORT_INTERVAL)
+    worker = commands.add_parser('worker', help='lease and process shards')
+    worker.add_argument('--run-id', help='defaults to the newest run with unfinished shards')
+    worker.add_argument('--worker-id')
+    worker.add_argument('--wait', action='store_true', help='keep polling for expired leases until the run is done')
+    args = parser.parse_args()
+
+    if args.command == 'coordinator':
+        return run_coordinator(args.job, args.shards, args.local_workers, args.interval)
+    return run_worker(args.run_id, args.worker_id, args.wait)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+import logging
+import threading
+import time
+import uuid
+import zlib
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 300  # a worker that stops renewing for this long loses its shard
+LEASE_HEARTBEAT_SECONDS = 30  # how often a worker extends its lease while a step runs
+
+Lease = namedtuple('Lease', ['run_id', 'job', 'shard', 'shard_count', 'checkpoint', 'attempts', 'token'])
+
+
+class LeaseLost(Exception):
+    """The shard's lease expired and another worker claimed it."""
+
+
+def shard_of(scheme_code, shard_count):
+    # crc32 rather than hash(): it must agree across processes and machines.
+    return zlib.crc32(str(scheme_code).encode()) % shard_count
+
+
+def create_lease_table_if_not_exists(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_leases (
+            run_id VARCHAR(50) NOT NULL,
+            shard INT NOT NULL,
+            job VARCHAR(30) NOT NULL,
+            shard_count INT NOT NULL,
+            status ENUM('pending', 'leased', 'done') NOT NULL DEFAULT 'pending',
+            worker VARCHAR(100),
+            claim_token CHAR(32),
+            lease_expires_at TIMESTAMP NULL,
+            checkpoint VARCHAR(20),
+            attempts INT NOT NULL DEFAULT 0,
+            renewals INT NOT NULL DEFAULT 0,
+            schemes_done INT NOT NULL DEFAULT 0,
+            schemes_failed INT NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP NULL,
+            PRIMARY KEY (run_id, shard),
+            INDEX idx_lease_claim (run_id, status, lease_expires_at),
+            UNIQUE KEY uq_lease_token (claim_token)
+        )
+    """)
+
+
+def create_run(connection, run_id, job, shard_count):
+    cursor = connection.cursor()
+    try:
+        create_lease_table_if_not_exists(cursor)
+        cursor.executemany("""
+            INSERT INTO ingest_leases (run_id, shard, job, shard_count)
+            VALUES (%s, %s, %s, %s)
+        """, [(run_id, shard, job, shard_count) for shard in range(shard_count)])
+        connection.commit()
+    finally:
+        cursor.close()
+    logger.info(f"Created ingest run {run_id}: {job} in {shard_count} shards")
+
+
+def latest_open_run(connection):
+    """run_id of the newest run that still has unfinished shards, or None."""
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT run_id FROM ingest_leases
+        WHERE status <> 'done'
+        ORDER BY created_at DESC, run_id DESC
+        LIMIT 1
+    """)
+    row = cursor.fetchone()
+    cursor.close()
+    return row[0] if row else None
+
+
+def claim_shard(connection, run_id, worker, lease_seconds=LEASE_SECONDS):
+    """Lease a pending shard (or one whose lease expired) to `worker`. Returns a Lease or None.
+
+    The UPDATE ... LIMIT 1 row lock decides between competing workers; the random
+    claim token is how the winner finds out which shard it got.
+    """
+    token = uuid.uuid4().hex
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            UPDATE ingest_leases
+            SET status = 'leased', worker = %s, claim_token = %s,
+                lease_expires_at = CURRENT_TIMESTAMP + INTERVAL %s SECOND,
+                attempts = attempts + 1
+            WHERE run_id = %s
+            AND (status = 'pending' OR (status = 'leased' AND lease_expires_at < CURRENT_TIMESTAMP))
+            ORDER BY status = 'leased', shard
+            LIMIT 1
+        """, (worker, token, lease_seconds, run_id))
+        connection.commit()
+        if cursor.rowcount == 0:
+            return None
+        cursor.execute("""
+            SELECT job, shard, shard_count, checkpoint, attempts FROM ingest_leases
+            WHERE run_id = %s AND claim_token = %s
+        """, (run_id, token))
+        job, shard, shard_count, checkpoint, attempts = cursor.fetchone()
+    finally:
+        cursor.close()
+    if attempts > 1:
+        logger.warning(f"Took over expired shard {shard}/{shard_count} of {run_id} at checkpoint {checkpoint}")
+    return Lease(run_id, job, shard, shard_count, checkpoint, attempts, token)
+
+
+def renew_lease(connection, lease, checkpoint, done=0, failed=0, lease_seconds=LEASE_SECONDS):
+    """Record progress up to `checkpoint` and extend the lease; raises LeaseLost if it was taken over."""
+    cursor = connection.cursor()
+    try:
+        # renewals always changes, so rowcount is 0 only when the token no longer matches.
+        cursor.execute("""
+            UPDATE ingest_leases
+            SET lease_expires_at = CURRENT_TIMESTAMP + INTERVAL %s SECOND,
+                checkpoint = %s,
+                schemes_done = schemes_done + %s,
+                schemes_failed = schemes_failed + %s,
+                renewals = renewals + 1
+            WHERE run_id = %s AND shard = %s AND claim_token = %s AND status = 'leased'
+        """, (lease_seconds, checkpoint, done, failed, lease.run_id, lease.shard, lease.token))
+        connection.commit()
+        if cursor.rowcount == 0:
+            raise LeaseLost(f"Lost the lease on shard {lease.shard} of {lease.run_id}")
+    finally:
+        cursor.close()
+    return lease._replace(checkpoint=checkpoint)
+
+
+def extend_lease(connection, lease, lease_seconds=LEASE_SECONDS):
+    """Extend the lease without recording progress; raises LeaseLost if it was taken over."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            UPDATE ingest_leases
+            SET lease_expires_at = CURRENT_TIMESTAMP + INTERVAL %s SECOND,
+                renewals = renewals + 1
+            WHERE run_id = %s AND shard = %s AND claim_token = %s AND status = 'leased'
+        """, (lease_seconds, lease.run_id, lease.shard, lease.token))
+        connection.commit()
+        if cursor.rowcount == 0:
+            raise LeaseLost(f"Lost the lease on shard {lease.shard} of {lease.run_id}")
+    finally:
+        cursor.close()
+
+
+class LeaseHeartbeat:
+    """Keeps a lease alive from a background thread while its owner works through a step.
+
+    A step can outlast LEASE_SECONDS (a new-schemes step is 100 mftool fetches), so the
+    owner cannot rely on renew_lease between steps alone. The thread needs a connection
+    of its own; the owner's is busy with the step. The owner calls check() as it goes:
+    it raises LeaseLost once the lease was taken over, or once renewals have been failing
+    for long enough that another worker may already have claimed the shard.
+    """
+
+    def __init__(self, connection, lease, interval=LEASE_HEARTBEAT_SECONDS, lease_seconds=LEASE_SECONDS):
+        self.connection = connection
+        self.lease = lease
+        self.interval = interval
+        self.lease_seconds = lease_seconds
+        self.renewed_at = time.monotonic()
+        self.lost = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'lease-heartbeat-{lease.shard}', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            started = time.monotonic()
+            try:
+                extend_lease(self.connection, self.lease, self.lease_seconds)
+                self.renewed_at = started
+            except LeaseLost as e:
+                self.lost = e
+                return
+            except Exception as e:
+                logger.warning(f"Could not extend the lease on shard {self.lease.shard} of {self.lease.run_id}: {e}")
+
+    def check(self):
+        if self.lost is not None:
+            raise self.lost
+        if time.monotonic() - self.renewed_at > self.lease_seconds - self.interval:
+            raise LeaseLost(f"Could not renew the lease on shard {self.lease.shard} of {self.lease.run_id} "
+                            f"for {self.lease_seconds - self.interval}s")
+
+
+def complete_shard(connection, lease):
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            UPDATE ingest_leases
+            SET status = 'done', lease_expires_at = NULL, finished_at = CURRENT_TIMESTAMP
+            WHERE run_id = %s AND shard = %s AND claim_token = %s AND status = 'leased'
+        """, (lease.run_id, lease.shard, lease.token))
+        connection.commit()
+        if cursor.rowcount == 0:
+            raise LeaseLost(f"Lost the lease on shard {lease.shard} of {lease.run_id}")
+    finally:
+        cursor.close()
+
+
+def run_progress(connection, run_id):
+    """Shard counts by state and scheme totals for one run."""
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT
+            COUNT(*),
+            COALESCE(SUM(status = 'done'), 0),
+            COALESCE(SUM(status = 'leased' AND lease_expires_at >= CURRENT_TIMESTAMP), 0),
+            COALESCE(SUM(status = 'leased' AND lease_expires_at < CURRENT_TIMESTAMP), 0),
+            COALESCE(SUM(schemes_done), 0),
+            COALESCE(SUM(schemes_failed), 0),
+            COUNT(DISTINCT CASE WHEN status = 'leased' THEN worker END)
+        FROM ingest_leases
+        WHERE run_id = %s
+    """, (run_id,))
+    shards, done, leased, expired, schemes_done, schemes_failed, workers = cursor.fetchone()
+    cursor.close()
+    return {
+        'shards': shards,
+        'done': int(done),
+        'leased': int(leased),
+        'expired': int(expired),
+        'pending': shards - int(done) - int(leased) - int(expired),
+        'schemes_done': int(schemes_done),
+        'schemes_failed': int(schemes_failed),
+        'workers': workers,
+    }
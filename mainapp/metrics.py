@@ -0,0 +1,196 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+METRICS_FILE = 'metrics/ingest.prom'  # node_exporter textfile-collector format
+METRICS_PORT = 9108
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    labels = format_labels(self.labelnames + ('le',), key + (repr(float(bound)),))
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = format_labels(self.labelnames + ('le',), key + ('+Inf',))
+                lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+                lines.append(f"{self.name}_sum{format_labels(self.labelnames, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{format_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'rupya_ingest_stage_seconds', 'Wall time of one call to an ingest stage.', ['stage'])
+STAGE_ERRORS = REGISTRY.counter(
+    'rupya_ingest_stage_errors_total', 'Ingest stage calls that raised.', ['stage'])
+REQUESTS = REGISTRY.counter(
+    'rupya_ingest_requests_total', 'HTTP requests made to data sources.', ['source'])
+REQUEST_ERRORS = REGISTRY.counter(
+    'rupya_ingest_request_errors_total', 'Failed requests and unusable responses.', ['source'])
+RETRIES = REGISTRY.counter(
+    'rupya_ingest_retries_total', 'Requests retried after a retryable failure.', ['source'])
+SCHEMES = REGISTRY.counter(
+    'rupya_ingest_schemes_total', 'Schemes processed, by stage and outcome.', ['stage', 'outcome'])
+ROWS = REGISTRY.counter(
+    'rupya_ingest_rows_total', 'Rows handed to the database, by table and outcome.', ['table', 'outcome'])
+COMMIT_SECONDS = REGISTRY.histogram(
+    'rupya_ingest_batch_commit_seconds', 'Duration of batch commits.', ['table'])
+
+
+def instrumented(stage):
+    """Decorator: time every call of a stage and count the ones that raise."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with STAGE_SECONDS.time(stage=stage):
+                try:
+                    return fn(*args, **kwargs)
+                except Exception:
+                    STAGE_ERRORS.inc(stage=stage)
+                    raise
+        return wrapper
+    return decorator
+
+
+def write_metrics(path=METRICS_FILE):
+    """Write the registry atomically so a scraper never reads a half-written file."""
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    part_path = f"{path}.part"
+    with open(part_path, 'w') as f:
+        f.write(REGISTRY.render())
+    os.replace(part_path, path)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve_metrics(port=METRICS_PORT, host='127.0.0.1'):
+    """Serve /metrics from a daemon thread for the lifetime of the process."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Serving ingest metrics on http://{host}:{port}/metrics")
+    return server
+
+
+class SampledLog:
+    """Log the first `limit` messages of each kind, then only count them.
+
+    Keeps per-scheme warnings out of the log file during a 40k-scheme run; call
+    summary() at the end to log how many were suppressed.
+    """
+
+    def __init__(self, logger, limit=10):
+        self.logger = logger
+        self.limit = limit
+        self.counts = {}
+
+    def log(self, level, kind, message, exc_info=False):
+        count = self.counts[kind] = self.counts.get(kind, 0) + 1
+        if count <= self.limit:
+            self.logger.log(level, message, exc_info=exc_info)
+
+    def summary(self):
+        for kind, count in sorted(self.counts.items()):
+            if count > self.limit:
+                self.logger.warning(f"{count} x {kind} ({count - self.limit} not logged individually)")
@@ -0,0 +1,173 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from itertools import islice
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+
+from metrics import REQUEST_ERRORS, REQUESTS, RETRIES, SCHEMES, SampledLog
+
+logger = logging.getLogger(__name__)
+
+MFAPI_BASE_URL = 'https://api.mfapi.in/mf'
+
+NAV_FETCH_WORKERS = 16
+NAV_FETCH_RATE = 20  # requests per second across all workers
+NAV_FETCH_BURST = 20
+NAV_FETCH_RETRIES = 3
+NAV_FETCH_BACKOFF = 0.5  # seconds, doubled on every retry
+NAV_FETCH_TIMEOUT = 10
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RetryableResponse(RequestException):
+    """Raised for responses that are worth retrying (rate limited or server error)."""
+
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code} for {response.url}", response=response)
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate) if rate else None
+        self.capacity = float(capacity or rate or 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate is None:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class NavFetcher:
+    """Fetch latest NAVs concurrently over a shared keep-alive session."""
+
+    def __init__(self, base_url=MFAPI_BASE_URL, max_workers=NAV_FETCH_WORKERS, rate=NAV_FETCH_RATE,
+                 burst=NAV_FETCH_BURST, retries=NAV_FETCH_RETRIES, backoff=NAV_FETCH_BACKOFF,
+                 timeout=NAV_FETCH_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst)
+
+        # One connection pool per host, sized so every worker can hold a keep-alive connection.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get_json(self, path):
+        url = f"{self.base_url}/{path}"
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            REQUESTS.inc(source='mfapi')
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    raise RetryableResponse(response)
+                response.raise_for_status()
+                return response.json()
+            except (RetryableResponse, requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.retries:
+                    REQUEST_ERRORS.inc(source='mfapi')
+                    raise
+                RETRIES.inc(source='mfapi')
+                delay = self.backoff * (2 ** attempt) * (1 + random.random())
+                retry_after = e.response.headers.get('Retry-After') if e.response is not None else None
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+                logger.debug(f"Retrying {url} in {delay:.2f}s after: {e}")
+                time.sleep(delay)
+
+    def get_latest_nav(self, scheme_code):
+        """Return the (current_nav, last_updated, fund_code) row for one scheme, or None."""
+        payload = self.get_json(f"{scheme_code}/latest")
+        latest = (payload or {}).get('data') or []
+        if not latest:
+            return None
+        current_nav = latest[0].get('nav')
+        last_updated = latest[0].get('date')
+        if not current_nav or not last_updated:
+            return None
+        last_updated = datetime.strptime(last_updated, '%d-%m-%Y').strftime('%Y-%m-%d %H:%M:%S')
+        return (float(current_nav), last_updated, scheme_code)
+
+    def iter_nav_data(self, scheme_codes):
+        """Yield NAV rows as they arrive, keeping at most two requests per worker in flight.
+
+        Bounding the submissions (instead of submitting every code up front) keeps memory flat
+        and lets a slow consumer hold the fetch back.
+        """
+        total_schemes = len(scheme_codes)
+        max_in_flight = self.max_workers * 2
+        issues = SampledLog(logger)
+        fetched = failed = index = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            codes = iter(scheme_codes)
+            futures = {}
+            for scheme_code in islice(codes, max_in_flight):
+                futures[pool.submit(self.get_latest_nav, scheme_code)] = scheme_code
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    scheme_code = futures.pop(future)
+                    for next_code in islice(codes, 1):
+                        futures[pool.submit(self.get_latest_nav, next_code)] = next_code
+                    index += 1
+                    try:
+                        row = future.result()
+                    except Exception as e:
+                        row = None
+                        failed += 1
+                        SCHEMES.inc(stage='fetch_nav', outcome='error')
+                        issues.log(logging.ERROR, 'error', f"Error processing scheme {scheme_code}: {str(e)}")
+                    else:
+                        if row:
+                            SCHEMES.inc(stage='fetch_nav', outcome='ok')
+                        else:
+                            SCHEMES.inc(stage='fetch_nav', outcome='incomplete')
+                            issues.log(logging.WARNING, 'incomplete data', f"Incomplete data for scheme {scheme_code}")
+
+                    if index % 1000 == 0:
+                        logger.info(f"Processed {index}/{total_schemes} schemes")
+                    if row:
+                        fetched += 1
+                        yield row
+
+        issues.summary()
+        logger.info(f"Fetched NAV for {fetched}/{total_schemes} schemes ({failed} failed)")
+
+    def fetch_nav_data(self, scheme_codes):
+        """Fetch NAVs for all scheme codes; returns rows in the shape update_fund_nav expects."""
+        return list(self.iter_nav_data(scheme_codes))
@@ -0,0 +1,191 @@
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+from db import create_nav_history_changes_table_if_not_exists, create_nav_history_table_if_not_exists
+from metrics import COMMIT_SECONDS, ROWS
+from nav_fetcher import NavFetcher
+
+logger = logging.getLogger(__name__)
+
+NAV_HISTORY_BATCH_SIZE = 5000
+NAV_LOOKBACK_DAYS = 15  # how far back an "as of" lookup may go to cover holidays
+
+
+def batched(rows, batch_size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def get_fund_ids_by_code(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT fund_code, fund_id FROM mutual_funds")
+    fund_ids = dict(cursor.fetchall())
+    cursor.close()
+    return fund_ids
+
+
+def load_nav_history(connection, rows, batch_size=NAV_HISTORY_BATCH_SIZE):
+    """Upsert (fund_id, nav_date, nav) rows with multi-row INSERTs, committing per batch.
+
+    Re-loading the same rows is a no-op apart from overwriting nav with the same value.
+    Every fund written is marked in nav_history_changes in the same transaction, so the
+    nightly analytics find the funds to recompute without scanning nav_history.
+    """
+    cursor = connection.cursor()
+    total = 0
+    try:
+        create_nav_history_changes_table_if_not_exists(cursor)
+        for batch in batched(rows, batch_size):
+            placeholders = ", ".join(["(%s, %s, %s)"] * len(batch))
+            params = [value for row in batch for value in row]
+            cursor.execute(f"""
+                INSERT INTO nav_history (fund_id, nav_date, nav)
+                VALUES {placeholders}
+                ON DUPLICATE KEY UPDATE nav = VALUES(nav)
+            """, params)
+            fund_ids = list(dict.fromkeys(row[0] for row in batch))
+            cursor.execute(f"""
+                INSERT INTO nav_history_changes (fund_id, changed_at)
+                VALUES {", ".join(["(%s, CURRENT_TIMESTAMP(6))"] * len(fund_ids))}
+                ON DUPLICATE KEY UPDATE changed_at = VALUES(changed_at)
+            """, fund_ids)
+            with COMMIT_SECONDS.time(table='nav_history'):
+                connection.commit()
+            ROWS.inc(len(batch), table='nav_history', outcome='upserted')
+            total += len(batch)
+    finally:
+        cursor.close()
+    return total
+
+
+def fetch_scheme_history(fetcher, fund_id, scheme_code):
+    """Full NAV history for one scheme as (fund_id, nav_date, nav) rows."""
+    payload = fetcher.get_json(str(scheme_code)) or {}
+    rows = []
+    for point in payload.get('data') or []:
+        try:
+            nav_date = datetime.strptime(point['date'], '%d-%m-%Y').date()
+            rows.append((fund_id, nav_date, float(point['nav'])))
+        except (KeyError, ValueError):
+            continue
+    return rows
+
+
+def iter_history_rows(fetcher, fund_ids_by_code, check=None, failures=None):
+    # Keep only a small window of schemes in flight so memory stays bounded on a full backfill.
+    # check, if given, is called before each scheme's rows are handed on; what it raises ends the load.
+    # failures, if given, is filled with scheme_code -> reason for every scheme whose fetch raised.
+    window = fetcher.max_workers * 2
+    pending = deque()
+    schemes = iter(fund_ids_by_code.items())
+    with ThreadPoolExecutor(max_workers=fetcher.max_workers) as pool:
+        while True:
+            for scheme_code, fund_id in islice(schemes, window - len(pending)):
+                pending.append((scheme_code, pool.submit(fetch_scheme_history, fetcher, fund_id, scheme_code)))
+            if not pending:
+                return
+            scheme_code, future = pending.popleft()
+            if check:
+                check()
+            try:
+                yield from future.result()
+            except Exception as e:
+                logger.error(f"Error fetching NAV history for scheme {scheme_code}: {str(e)}")
+                if failures is not None:
+                    failures[scheme_code] = f"{type(e).__name__}: {e}"
+
+
+def backfill_nav_history(connection, scheme_codes=None, fetcher=None, check=None, failures=None):
+    """Load the complete published NAV history for the given (default: all) schemes."""
+    cursor = connection.cursor()
+    create_nav_history_table_if_not_exists(cursor)
+    cursor.close()
+    fund_ids_by_code = get_fund_ids_by_code(connection)
+    if scheme_codes is not None:
+        fund_ids_by_code = {code: fund_ids_by_code[code] for code in scheme_codes if code in fund_ids_by_code}
+
+    owns_fetcher = fetcher is None
+    fetcher = fetcher or NavFetcher()
+    try:
+        total = load_nav_history(connection, iter_history_rows(fetcher, fund_ids_by_code, check, failures))
+    finally:
+        if owns_fetcher:
+            fetcher.close()
+    logger.info(f"Loaded {total} NAV history rows for {len(fund_ids_by_code)} schemes")
+    return total
+
+
+def ensure_nav_history_partition(cursor, year):
+    """Split the pmax catch-all so nav_date values in `year` get their own partition."""
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = 'nav_history' AND partition_name = %s
+    """, (f"p{year}",))
+    if cursor.fetchone()[0]:
+        return False
+    cursor.execute(f"""
+        ALTER TABLE nav_history REORGANIZE PARTITION pmax INTO (
+            PARTITION p{year} VALUES LESS THAN ('{year + 1}-01-01'),
+            PARTITION pmax VALUES LESS THAN (MAXVALUE)
+        )
+    """)
+    return True
+
+
+def ensure_nav_history_partitions(connection, today=None):
+    """Keep yearly partitions through next year, so new NAVs never land in pmax.
+
+    Run by the daily update. Staying a year ahead means pmax is empty whenever it is
+    split, so the ALTER is cheap, and get_nav_as_of keeps pruning to yearly partitions.
+    """
+    today = today or date.today()
+    cursor = connection.cursor()
+    try:
+        # Databases set up before nav_history existed get it here, partitioned through next year.
+        create_nav_history_table_if_not_exists(cursor)
+        for year in (today.year, today.year + 1):
+            if ensure_nav_history_partition(cursor, year):
+                logger.info(f"Added nav_history partition p{year}")
+    finally:
+        cursor.close()
+
+
+def get_nav_as_of(cursor, fund_id, as_of, lookback_days=NAV_LOOKBACK_DAYS):
+    """Latest (nav_date, nav) on or before as_of, or None.
+
+    The bounded lookback lets MySQL prune to at most two yearly partitions.
+    """
+    cursor.execute("""
+        SELECT nav_date, nav FROM nav_history
+        WHERE fund_id = %s AND nav_date BETWEEN %s AND %s
+        ORDER BY nav_date DESC
+        LIMIT 1
+    """, (fund_id, as_of - timedelta(days=lookback_days), as_of))
+    return cursor.fetchone()
+
+
+def get_navs_as_of(cursor, fund_ids, as_of, lookback_days=NAV_LOOKBACK_DAYS):
+    """Batch form of get_nav_as_of: {fund_id: (nav_date, nav)} for every fund with a NAV in range."""
+    fund_ids = list(fund_ids)
+    if not fund_ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(fund_ids))
+    start = as_of - timedelta(days=lookback_days)
+    cursor.execute(f"""
+        SELECT h.fund_id, h.nav_date, h.nav
+        FROM nav_history h
+        JOIN (
+            SELECT fund_id, MAX(nav_date) AS nav_date
+            FROM nav_history
+            WHERE fund_id IN ({placeholders}) AND nav_date BETWEEN %s AND %s
+            GROUP BY fund_id
+        ) latest ON latest.fund_id = h.fund_id AND latest.nav_date = h.nav_date
+    """, fund_ids + [start, as_of])
+    return {fund_id: (nav_date, nav) for fund_id, nav_date, nav in cursor.fetchall()}
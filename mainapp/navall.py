@@ -0,0 +1,103 @@
+import json
+import logging
+import os
+from collections import namedtuple
+from datetime import datetime
+
+import requests
+
+from metrics import REQUESTS, instrumented
+
+logger = logging.getLogger(__name__)
+
+NAVALL_URL = 'https://www.amfiindia.com/spages/NAVAll.txt'
+NAVALL_CACHE_DIR = 'cache'
+NAVALL_FILE_NAME = 'NAVAll.txt'
+
+NavRecord = namedtuple('NavRecord', ['fund_code', 'scheme_name', 'nav', 'nav_date'])
+
+
+@instrumented('download_navall')
+def download_navall(url=NAVALL_URL, cache_dir=NAVALL_CACHE_DIR, session=None, timeout=60):
+    """Download the AMFI NAVAll file unless the cached copy is current. Returns (path, changed)."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, NAVALL_FILE_NAME)
+    meta_path = f"{path}.meta.json"
+
+    headers = {}
+    if os.path.exists(path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    http = session or requests
+    REQUESTS.inc(source='navall')
+    with http.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304:
+            logger.info("NAVAll file unchanged since last download")
+            return path, False
+        response.raise_for_status()
+
+        # Per-process names: local ingest workers share the cache directory and download at once.
+        part_path = f"{path}.{os.getpid()}.part"
+        size = 0
+        try:
+            with open(part_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(part_path, path)
+
+            with open(part_path, 'w') as f:
+                json.dump({
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'downloaded_at': datetime.now().isoformat(),
+                }, f)
+            os.replace(part_path, meta_path)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+    logger.info(f"Downloaded NAVAll file ({size} bytes)")
+    return path, True
+
+
+def iter_navall_records(lines):
+    """Yield a NavRecord for every scheme line; header, AMC and category lines are skipped."""
+    parsed_dates = {}
+    for line in lines:
+        parts = line.rstrip('\r\n').split(';')
+        if len(parts) < 6:
+            continue
+        fund_code = parts[0].strip()
+        if not fund_code.isdigit():
+            continue
+
+        # NAV and date are the last two columns; newer files insert plan/option columns before them.
+        raw_date = parts[-1].strip()
+        nav_date = parsed_dates.get(raw_date)
+        if nav_date is None:
+            try:
+                nav_date = datetime.strptime(raw_date, '%d-%b-%Y').date()
+            except ValueError:
+                logger.debug(f"Unparseable NAV date {raw_date!r} for scheme {fund_code}")
+                continue
+            parsed_dates[raw_date] = nav_date
+
+        try:
+            nav = float(parts[-2])
+        except ValueError:
+            nav = None  # AMFI publishes 'N.A.' for schemes without a NAV
+
+        yield NavRecord(fund_code, parts[3].strip(), nav, nav_date)
+
+
+def read_navall(path):
+    """Stream NavRecords from a downloaded NAVAll file without loading it into memory."""
+    with open(path, encoding='utf-8', errors='replace') as f:
+        yield from iter_navall_records(f)
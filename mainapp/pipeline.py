@@ -0,0 +1,102 @@
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_BATCH_SIZE = 1000
+PIPELINE_FLUSH_INTERVAL = 5.0  # seconds; a partial batch is written at least this often
+PIPELINE_QUEUE_BATCHES = 2  # queue capacity, in batches, before the producer blocks
+PIPELINE_CHUNK_SIZE = 100  # items are handed over in chunks to keep queue overhead off fast producers
+PIPELINE_CHUNK_INTERVAL = 0.1  # seconds; a slow producer hands over partial chunks this often
+
+_DONE = object()
+_TIMEOUT = object()
+
+
+class _ProducerError:
+    def __init__(self, error):
+        self.error = error
+
+
+def _produce(items, channel, stop, chunk_size):
+    def put(item):
+        # Block while the queue is full (backpressure), but give up once the writer has stopped.
+        while not stop.is_set():
+            try:
+                channel.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    iterator = iter(items)
+    chunk = []
+    handed_over = time.monotonic()
+    try:
+        for item in iterator:
+            chunk.append(item)
+            if len(chunk) >= chunk_size or time.monotonic() - handed_over >= PIPELINE_CHUNK_INTERVAL:
+                if not put(chunk):
+                    return
+                chunk = []
+                handed_over = time.monotonic()
+        if chunk and not put(chunk):
+            return
+    except BaseException as e:
+        put(_ProducerError(e))
+    else:
+        put(_DONE)
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close:
+            close()
+
+
+def run_pipeline(items, write_batch, batch_size=PIPELINE_BATCH_SIZE, flush_interval=PIPELINE_FLUSH_INTERVAL,
+                 max_pending=None):
+    """Consume `items` on a producer thread and hand them to write_batch(list) in batches.
+
+    write_batch runs on the calling thread (which owns the database connection) every
+    batch_size items or flush_interval seconds, whichever comes first, while the producer
+    keeps fetching. At most max_pending items wait in the queue, so peak memory does not
+    depend on how many items the producer yields. An exception on either side stops both
+    and is re-raised here. Returns the number of items written.
+    """
+    max_pending = max_pending or batch_size * PIPELINE_QUEUE_BATCHES
+    chunk_size = max(1, min(PIPELINE_CHUNK_SIZE, batch_size, max_pending))
+    channel = queue.Queue(maxsize=max(1, max_pending // chunk_size))
+    stop = threading.Event()
+    producer = threading.Thread(target=_produce, args=(items, channel, stop, chunk_size),
+                                name='pipeline-producer', daemon=True)
+    producer.start()
+
+    written = 0
+    batch = []
+    deadline = time.monotonic() + flush_interval
+    try:
+        while True:
+            try:
+                chunk = channel.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                chunk = _TIMEOUT
+            if chunk is _DONE:
+                break
+            if isinstance(chunk, _ProducerError):
+                raise chunk.error
+            if chunk is not _TIMEOUT:
+                batch.extend(chunk)
+            if len(batch) >= batch_size or time.monotonic() >= deadline:
+                if batch:
+                    write_batch(batch)
+                    written += len(batch)
+                    batch = []
+                deadline = time.monotonic() + flush_interval
+        if batch:
+            write_batch(batch)
+            written += len(batch)
+    finally:
+        stop.set()
+        producer.join()
+    return written
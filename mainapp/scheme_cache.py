@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEME_CACHE_PATH = os.path.join('cache', 'scheme_metadata.sqlite3')  # next to the NAVAll cache
+SCHEME_CACHE_TTL = 30 * 24 * 3600  # scheme names and categories change a few times a year at most
+SCHEME_CACHE_MAX_ENTRIES = 100000  # AMFI lists ~45k schemes, including closed ones
+SCHEME_CACHE_EVICT_EVERY = 1000  # writes between size checks
+
+
+class SchemeMetadataCache:
+    """On-disk cache of mftool get_scheme_details() responses, keyed by scheme code.
+
+    Entries older than `ttl` are misses. Once the file holds more than `max_entries`,
+    the least recently used entries are evicted. Safe to share between threads: the
+    ingest fetches on a pipeline producer thread.
+    """
+
+    def __init__(self, path=SCHEME_CACHE_PATH, ttl=SCHEME_CACHE_TTL, max_entries=SCHEME_CACHE_MAX_ENTRIES):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        # Autocommit; WAL keeps each small write cheap and lets another ingest process read meanwhile.
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS scheme_metadata (
+                scheme_code TEXT PRIMARY KEY,
+                details TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_scheme_metadata_last_used ON scheme_metadata (last_used)")
+
+    def get(self, scheme_code):
+        """Cached details for scheme_code, or None when missing or older than the TTL."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT details, fetched_at FROM scheme_metadata WHERE scheme_code = ?", (str(scheme_code),)
+            ).fetchone()
+            if row is None or now - row[1] >= self.ttl:
+                self.misses += 1
+                return None
+            self._db.execute(
+                "UPDATE scheme_metadata SET last_used = ? WHERE scheme_code = ?", (now, str(scheme_code)))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, scheme_code, details):
+        now = time.time()
+        with self._lock:
+            self._db.execute("""
+                INSERT OR REPLACE INTO scheme_metadata (scheme_code, details, fetched_at, last_used)
+                VALUES (?, ?, ?, ?)
+            """, (str(scheme_code), json.dumps(details), now, now))
+            self._writes += 1
+            if self._writes % SCHEME_CACHE_EVICT_EVERY == 0:
+                self._evict(now)
+
+    def evict(self):
+        with self._lock:
+            return self._evict(time.time())
+
+    def _evict(self, now):
+        expired = self._db.execute(
+            "DELETE FROM scheme_metadata WHERE fetched_at <= ?", (now - self.ttl,)).rowcount
+        excess = self._db.execute("SELECT COUNT(*) FROM scheme_metadata").fetchone()[0] - self.max_entries
+        evicted = 0
+        if excess > 0:
+            evicted = self._db.execute("""
+                DELETE FROM scheme_metadata WHERE scheme_code IN (
+                    SELECT scheme_code FROM scheme_metadata ORDER BY last_used LIMIT ?
+                )
+            """, (excess,)).rowcount
+        if expired or evicted:
+            logger.info(f"Scheme metadata cache: dropped {expired} expired and {evicted} least recently used entries")
+        return expired + evicted
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM scheme_metadata").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -1,17 +1,25 @@
-from mftool import Mftool
-import pandas as pd
 import time
 import json
 import logging
 import mysql.connector
 from mysql.connector import Error
-import schedule
-from datetime import datetime, timedelta
-import pytz
-from db import create_database_connection
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from db import ANALYTICS_DATA_VERSION, VALUATION_DATA_VERSION, bump_data_version, create_database_connection
 import requests
 import os
 from requests.exceptions import RequestException
+from nav_fetcher import NavFetcher
+from navall import download_navall, read_navall
+from nav_history import ensure_nav_history_partitions, get_fund_ids_by_code, load_nav_history
+from holdings import rebuild_holdings
+from sip_executor import execute_due_sips
+from pipeline import run_pipeline
+from scheme_cache import SchemeMetadataCache
+from backfill import (BACKFILL_BATCH_SIZE, BACKFILL_MAX_ATTEMPTS, create_backfill_table_if_not_exists,
+                      get_attempted_scheme_codes, get_due_retries, record_backfill_progress)
+from metrics import (COMMIT_SECONDS, REQUEST_ERRORS, REQUESTS, ROWS, SCHEMES, STAGE_SECONDS, SampledLog,
+                     instrumented, serve_metrics, write_metrics)
 
 if not os.path.exists('logs'):
     os.makedirs('logs')
@@ -31,6 +39,36 @@ logging.getLogger('').addHandler(console)
 
 logger = logging.getLogger(__name__)
 
+# mftool (which drags in pandas, yfinance and matplotlib), numpy, pytz and schedule are
+# imported by the functions that need them: importing them here made every ingest
+# command pay ~1.5s of startup before it did any work. benchmarks/bench_startup.py
+# fails if one of them comes back.
+
+def new_mftool():
+    from mftool import Mftool
+    return Mftool()
+
+_scheme_metadata_cache = None
+
+def get_scheme_metadata_cache():
+    global _scheme_metadata_cache
+    if _scheme_metadata_cache is None:
+        _scheme_metadata_cache = SchemeMetadataCache()
+    return _scheme_metadata_cache
+
+def get_scheme_details(mf, scheme_code, metadata_cache):
+    # Name and category barely change, so the details call is skipped while the cached copy is fresh.
+    details = metadata_cache.get(scheme_code)
+    if details is not None:
+        SCHEMES.inc(stage='metadata_cache', outcome='hit')
+        return details
+    SCHEMES.inc(stage='metadata_cache', outcome='miss')
+    REQUESTS.inc(source='mftool')
+    details = mf.get_scheme_details(scheme_code)
+    if isinstance(details, dict) and details.get('scheme_category'):
+        metadata_cache.set(scheme_code, details)
+    return details
+
 def create_table_if_not_exists(cursor):
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS mutual_funds (
@@ -50,6 +88,7 @@ def get_existing_scheme_codes(connection):
     cursor.close()
     return scheme_codes
 
+@instrumented('insert_or_update_fund')
 def insert_or_update_fund(connection, fund_data_batch):
     cursor = connection.cursor()
     successful_updates = 0
@@ -68,67 +107,102 @@ def insert_or_update_fund(connection, fund_data_batch):
         
         cursor.executemany(query, fund_data_batch)
         successful_updates = cursor.rowcount
-        connection.commit()
-        logger.info(f"Successfully updated {successful_updates} funds.")
+        with COMMIT_SECONDS.time(table='mutual_funds'):
+            connection.commit()
+        ROWS.inc(len(fund_data_batch), table='mutual_funds', outcome='upserted')
+        logger.debug(f"Successfully updated {successful_updates} funds.")
     except mysql.connector.Error as e:
         connection.rollback()
         logger.error(f"Transaction failed. Error: {e}")
         failed_updates = len(fund_data_batch)
+        ROWS.inc(failed_updates, table='mutual_funds', outcome='failed')
     finally:
         cursor.close()
 
     return successful_updates, failed_updates
 
-def update_fund_nav(cursor, fund_data_batch):
+def nav_snapshot_key(current_nav, last_updated):
+    # Normalise to what MySQL stores: DECIMAL(10, 2) rounds half up, TIMESTAMP has no date-only form.
+    if current_nav is not None:
+        current_nav = Decimal(str(current_nav)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    if isinstance(last_updated, str):
+        last_updated = datetime.strptime(last_updated, '%Y-%m-%d %H:%M:%S')
+    elif isinstance(last_updated, date) and not isinstance(last_updated, datetime):
+        last_updated = datetime.combine(last_updated, datetime.min.time())
+    return current_nav, last_updated
+
+def load_nav_snapshot(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT fund_code, current_nav, last_updated FROM mutual_funds")
+    snapshot = {row[0]: nav_snapshot_key(row[1], row[2]) for row in cursor.fetchall()}
+    cursor.close()
+    return snapshot
+
+@instrumented('update_fund_nav')
+def update_fund_nav(cursor, fund_data_batch, snapshot=None):
+    """Write NAV rows; with a snapshot only rows whose NAV or date moved are sent.
+
+    Returns (changed_rows, unchanged, missing): the rows written, and counts of rows
+    skipped as unchanged or because their fund is not in the table.
+    """
     query = """
     UPDATE mutual_funds
     SET current_nav = %s, last_updated = %s
     WHERE fund_code = %s
     """
-    cursor.executemany(query, fund_data_batch)
+    if snapshot is None:
+        cursor.executemany(query, fund_data_batch)
+        ROWS.inc(len(fund_data_batch), table='mutual_funds', outcome='changed')
+        return fund_data_batch, 0, 0
 
+    changed_rows = []
+    unchanged = 0
+    missing = 0
+    for current_nav, last_updated, fund_code in fund_data_batch:
+        previous = snapshot.get(fund_code)
+        if previous is None:
+            missing += 1
+            continue
+        key = nav_snapshot_key(current_nav, last_updated)
+        if key == previous:
+            unchanged += 1
+            continue
+        changed_rows.append((current_nav, last_updated, fund_code))
+        snapshot[fund_code] = key
 
-def fetch_mutual_fund_nav_data(mf, scheme_codes):
-    data = []
-    total_schemes = len(scheme_codes)
-    
-    for index, scheme_code in enumerate(scheme_codes, 1):
-        try:
-            nav_details = mf.get_scheme_quote(scheme_code)
-            
-            current_nav = nav_details.get('nav')
-            last_updated = nav_details.get("last_updated")
-            
-            if current_nav and last_updated:
-                data.append((
-                    None, 
-                    scheme_code,
-                    None,  
-                    float(current_nav),
-                    last_updated
-                ))
-                logger.info(f"Fetched NAV {current_nav} for scheme {scheme_code}")
-            else:
-                logger.warning(f"Incomplete data for scheme {scheme_code}")
-            
-            if index % 100 == 0:
-                logger.info(f"Processed {index}/{total_schemes} schemes")
-                time.sleep(1) 
-        except Exception as e:
-            logger.error(f"Error processing scheme {scheme_code}: {str(e)}", exc_info=True)
-    
-    return data
+    if changed_rows:
+        cursor.executemany(query, changed_rows)
+    ROWS.inc(len(changed_rows), table='mutual_funds', outcome='changed')
+    ROWS.inc(unchanged, table='mutual_funds', outcome='unchanged')
+    ROWS.inc(missing, table='mutual_funds', outcome='missing')
+    return changed_rows, unchanged, missing
 
-def fetch_mutual_fund_full_data(mf, scheme_codes):
-    data = []
+
+@instrumented('fetch_mutual_fund_nav_data')
+def fetch_mutual_fund_nav_data(scheme_codes, fetcher=None):
+    if fetcher is None:
+        with NavFetcher() as fetcher:
+            return fetcher.fetch_nav_data(scheme_codes)
+    return fetcher.fetch_nav_data(scheme_codes)
+
+def iter_mutual_fund_full_data(mf, scheme_codes, metadata_cache=None, check=None):
+    # Yields (scheme_code, row, None) for every fetched scheme and (scheme_code, None, reason) for failures.
+    # check, if given, is called before each fetch; whatever it raises ends the iteration.
     total_schemes = len(scheme_codes)
+    issues = SampledLog(logger)
+    if metadata_cache is None:
+        metadata_cache = get_scheme_metadata_cache()
     
     for index, scheme_code in enumerate(scheme_codes, 1):
+        if check:
+            check()
         try:
-            logger.info(f"Processing scheme {scheme_code} ({index}/{total_schemes})")
-            
-            nav_details = mf.get_scheme_quote(scheme_code)
-            asset_category = mf.get_scheme_details(scheme_code)
+            # Per-scheme fetch latency; the backfill consumes this generator directly, so no
+            # @instrumented stage around it would see individual schemes.
+            with STAGE_SECONDS.time(stage='fetch_scheme'):
+                REQUESTS.inc(source='mftool')
+                nav_details = mf.get_scheme_quote(scheme_code)
+                asset_category = get_scheme_details(mf, scheme_code, metadata_cache)
             
             if not isinstance(nav_details, dict) or not isinstance(asset_category, dict):
                 raise ValueError(f"Unexpected response format for scheme {scheme_code}")
@@ -145,52 +219,107 @@ def fetch_mutual_fund_full_data(mf, scheme_codes):
                 last_updated = datetime.strptime(last_updated, '%d-%b-%Y')
                 last_updated = last_updated.strftime('%Y-%m-%d %H:%M:%S')
                 
-                data.append((
+                SCHEMES.inc(stage='fetch_full', outcome='ok')
+                yield scheme_code, (
                     scheme_name,
                     scheme_code,
                     category_type,
                     current_nav if isinstance(current_nav, str) else float(current_nav),
                     last_updated
-                ))
-                logger.info(f"Successfully processed scheme {scheme_code}")
+                ), None
             else:
-                logger.warning(f"Incomplete data for scheme {scheme_code}. scheme_name: {scheme_name}, last_updated: {last_updated}, category_type: {category_type}")
+                SCHEMES.inc(stage='fetch_full', outcome='incomplete')
+                issues.log(logging.WARNING, 'incomplete data', f"Incomplete data for scheme {scheme_code}. scheme_name: {scheme_name}, last_updated: {last_updated}, category_type: {category_type}")
+                yield scheme_code, None, 'Incomplete data'
             
             if index % 100 == 0:
                 logger.info(f"Processed {index}/{total_schemes} schemes")
                 time.sleep(2)  # Increased delay to avoid rate limits
                 
         except RequestException as e:
-            logger.error(f"RequestException processing scheme {scheme_code}: {str(e)}", exc_info=True)
+            REQUEST_ERRORS.inc(source='mftool')
+            SCHEMES.inc(stage='fetch_full', outcome='error')
+            issues.log(logging.ERROR, 'RequestException', f"RequestException processing scheme {scheme_code}: {str(e)}", exc_info=True)
+            yield scheme_code, None, f"RequestException: {e}"
         except json.JSONDecodeError as e:
-            logger.error(f"JSONDecodeError processing scheme {scheme_code}: {str(e)}", exc_info=True)
+            REQUEST_ERRORS.inc(source='mftool')
+            SCHEMES.inc(stage='fetch_full', outcome='error')
+            issues.log(logging.ERROR, 'JSONDecodeError', f"JSONDecodeError processing scheme {scheme_code}: {str(e)}", exc_info=True)
+            yield scheme_code, None, f"JSONDecodeError: {e}"
         except ValueError as e:
-            logger.error(f"ValueError processing scheme {scheme_code}: {str(e)}", exc_info=True)
+            SCHEMES.inc(stage='fetch_full', outcome='error')
+            issues.log(logging.ERROR, 'ValueError', f"ValueError processing scheme {scheme_code}: {str(e)}", exc_info=True)
+            yield scheme_code, None, f"ValueError: {e}"
         except Exception as e:
-            logger.error(f"Error processing scheme {scheme_code}: {str(e)}", exc_info=True)
+            SCHEMES.inc(stage='fetch_full', outcome='error')
+            issues.log(logging.ERROR, 'error', f"Error processing scheme {scheme_code}: {str(e)}", exc_info=True)
+            yield scheme_code, None, f"{type(e).__name__}: {e}"
         
         # Add a small delay between each request
         time.sleep(0.1)
     
+    issues.summary()
+
+@instrumented('fetch_mutual_fund_full_data')
+def fetch_mutual_fund_full_data(mf, scheme_codes, failures=None):
+    # failures, if given, is filled with scheme_code -> reason for every scheme that produced no row.
+    data = []
+    for scheme_code, row, error in iter_mutual_fund_full_data(mf, scheme_codes):
+        if row:
+            data.append(row)
+        elif failures is not None:
+            failures[scheme_code] = error
     return data
 
+def publish_navs(connection):
+    # Imported here: nav_snapshot needs numpy, which no other ingest job does.
+    from nav_snapshot import publish_nav_snapshot
+    try:
+        publish_nav_snapshot(connection)
+    except OSError as e:
+        # Web workers keep the old snapshot, and its version no longer matches, so they read MySQL.
+        logger.error(f"Could not publish NAV snapshot: {e}")
+
 def update_mutual_fund_data():
     logger.info("Starting daily mutual fund NAV update")
     connection = create_database_connection()
     if connection:
         try:
-            existing_scheme_codes = get_existing_scheme_codes(connection)
-            mf = Mftool()
-            fund_data = fetch_mutual_fund_nav_data(mf, existing_scheme_codes)
+            ensure_nav_history_partitions(connection)
+            snapshot = load_nav_snapshot(connection)
+            fund_ids = get_fund_ids_by_code(connection)
+            navall_path, _ = download_navall()
+            fund_data = (
+                (record.nav, record.nav_date, record.fund_code)
+                for record in read_navall(navall_path)
+                if record.nav is not None
+            )
             
             cursor = connection.cursor()
-            batch_size = 1000
-            for i in range(0, len(fund_data), batch_size):
-                batch = fund_data[i:i+batch_size]
-                update_fund_nav(cursor, batch)
-            
-            connection.commit()
-            logger.info(f"Updated NAV for {len(fund_data)} mutual funds in the database")
+            totals = {'changed': 0, 'unchanged': 0, 'missing': 0, 'history': 0}
+
+            def write_batch(batch):
+                changed_rows, unchanged, missing = update_fund_nav(cursor, batch, snapshot)
+                with COMMIT_SECONDS.time(table='mutual_funds'):
+                    connection.commit()
+                totals['changed'] += len(changed_rows)
+                totals['unchanged'] += unchanged
+                totals['missing'] += missing
+                # Only NAVs that moved go to nav_history: an unchanged one was recorded when it
+                # first arrived, and re-loading it would mark its fund for fund analytics again.
+                totals['history'] += load_nav_history(connection, [
+                    (fund_ids[fund_code], nav_date, current_nav)
+                    for current_nav, nav_date, fund_code in changed_rows
+                    if fund_code in fund_ids
+                ])
+
+            run_pipeline(fund_data, write_batch)
+            if totals['changed']:
+                bump_data_version(connection)
+            publish_navs(connection)
+            logger.info(f"Updated NAV for {totals['changed']} mutual funds in the database "
+                        f"({totals['unchanged']} unchanged, {totals['missing']} not in the database)")
+            logger.info(f"Recorded {totals['history']} rows in nav_history")
         except Error as e:
             logger.error(f"Database error: {e}")
         except requests.exceptions.RequestException as e:
@@ -198,9 +327,9 @@ def update_mutual_fund_data():
         except Exception as e:
             logger.error(f"Error: {e}")
         finally:
-            if connection.is_connected():
-                connection.close()
-                logger.info("MySQL connection is closed")
+            connection.close()
+            logger.info("MySQL connection is closed")
+            write_metrics()
     else:
         logger.error("Failed to connect to the database")
 
@@ -210,7 +339,7 @@ def check_and_add_new_schemes():
     if connection:
         try:
             existing_scheme_codes = set(get_existing_scheme_codes(connection))
-            mf = Mftool()
+            mf = new_mftool()
             all_scheme_codes = set(mf.get_scheme_codes().keys())
             new_scheme_codes = all_scheme_codes - existing_scheme_codes
             
@@ -232,55 +361,193 @@ def check_and_add_new_schemes():
         except Exception as e:
             logger.error(f"Error: {e}")
         finally:
-            if connection.is_connected():
-                connection.close()
-                logger.info("MySQL connection is closed")
+            connection.close()
+            logger.info("MySQL connection is closed")
     else:
         logger.error("Failed to connect to the database")
 
 
+@instrumented('backfill_schemes')
+def backfill_schemes(connection, mf, scheme_codes, batch_size=BACKFILL_BATCH_SIZE, check=None):
+    """Fetch and insert schemes, checkpointing every written batch in scheme_backfill.
+
+    Fetching runs on a producer thread while batches are written here, so a crash loses
+    at most the batches still in flight. check, if given, is called before every fetch
+    and every write; an exception from it abandons the rest of the backfill.
+
+    The caller bumps the NAV version and publishes the snapshot once the whole job is
+    done: the sharded backfill calls this once per step, and every bump empties the web
+    workers' NAV caches and cached dashboards.
+    """
+    totals = {'successful': 0, 'failed': 0, 'batches': 0}
+
+    def write_batch(results):
+        if check:
+            check()
+        batch = [row for _, row, _ in results if row]
+        failures = {scheme_code: error for scheme_code, row, error in results if not row}
+        successful, failed = insert_or_update_fund(connection, batch) if batch else (0, 0)
+        if failed:
+            # insert_or_update_fund rolled the whole batch back; retry every scheme in it.
+            failures.update((row[1], 'Database insert failed') for row in batch)
+            batch = []
+        record_backfill_progress(connection, [row[1] for row in batch], failures)
+        totals['successful'] += len(batch)
+        totals['failed'] += len(failures)
+        totals['batches'] += 1
+        logger.info(f"Batch {totals['batches']}: {len(batch)} successful, {len(failures)} failed "
+                    f"({totals['successful'] + totals['failed']}/{len(scheme_codes)} schemes)")
+
+    run_pipeline(iter_mutual_fund_full_data(mf, scheme_codes, check=check), write_batch, batch_size=batch_size)
+    return totals['successful'], totals['failed']
+
 def check_and_add_new_schemes(limit =  None):
     logger.info(f"Checking for new mutual fund schemes (limit: {limit if limit else 'None'})")
     connection = create_database_connection()
     if connection:
         try:
+            cursor = connection.cursor()
+            create_backfill_table_if_not_exists(cursor)
+            cursor.close()
+
             existing_scheme_codes = set(get_existing_scheme_codes(connection))
-            mf = Mftool()
-            all_scheme_codes = set(mf.get_scheme_codes().keys())
-            new_scheme_codes = list(all_scheme_codes - existing_scheme_codes)
+            # Codes already checkpointed were handled by an earlier (possibly interrupted) run;
+            # failed ones are picked up by retry_failed_schemes instead.
+            attempted_scheme_codes = get_attempted_scheme_codes(connection)
+            mf = new_mftool()
+            navall_path, _ = download_navall()
+            all_scheme_codes = {record.fund_code for record in read_navall(navall_path)}
+            new_scheme_codes = sorted(all_scheme_codes - existing_scheme_codes - attempted_scheme_codes)
             
             if limit:
                 new_scheme_codes = new_scheme_codes[:limit]
             
             if new_scheme_codes:
-                new_fund_data = fetch_mutual_fund_full_data(mf, new_scheme_codes)
-                total_sucessful = 0
-                total_failed = 0
-                batch_size = 1000
-                for i in range(0, len(new_fund_data), batch_size):
-                    batch = new_fund_data[i:i+batch_size]
-                    successful, failed = insert_or_update_fund(connection, batch)
-                    total_sucessful += successful
-                    total_failed +=  failed
-                    logger.info(f"Batch{i//batch_size +1}:")
-                    for fund in batch:
-                        logger.info(f"{fund}")
-                connection.commit()
-                logger.info(f"Added {len(new_fund_data)} new mutual fund schemes to the database")
+                logger.info(f"Backfilling {len(new_scheme_codes)} new schemes "
+                            f"({len(attempted_scheme_codes)} already attempted)")
+                total_sucessful, total_failed = backfill_schemes(connection, mf, new_scheme_codes)
+                if total_sucessful:
+                    bump_data_version(connection)
+                    publish_navs(connection)
+                logger.info(f"Added {total_sucessful} new mutual fund schemes to the database")
                 logger.info(f"Total sucessful updates: {total_sucessful}")
                 logger.info(f"Total failed_updates: {total_failed}")
             else:
                 logger.info("No new mutual fund schemes found")
         except Error as e:
             logger.error(f"Error: {e}")
+        except requests.exceptions.RequestException as e:
+            logger.error(f"RequestException: {e}")
+        except Exception as e:
+            logger.error(f"Error: {e}")
+        finally:
+            connection.close()
+            logger.info("MySQL connection is closed")
+            write_metrics()
+    else:
+        logger.error("Failed to connect to the database")
+
+def retry_failed_schemes(max_attempts=BACKFILL_MAX_ATTEMPTS):
+    logger.info("Retrying failed scheme backfills")
+    connection = create_database_connection()
+    if connection:
+        try:
+            cursor = connection.cursor()
+            create_backfill_table_if_not_exists(cursor)
+            cursor.close()
+
+            due_scheme_codes = get_due_retries(connection, max_attempts)
+            if due_scheme_codes:
+                total_sucessful, total_failed = backfill_schemes(connection, new_mftool(), due_scheme_codes)
+                if total_sucessful:
+                    bump_data_version(connection)
+                    publish_navs(connection)
+                logger.info(f"Retried {len(due_scheme_codes)} schemes: {total_sucessful} added, {total_failed} still failing")
+            else:
+                logger.info("No failed schemes due for retry")
+        except Error as e:
+            logger.error(f"Error: {e}")
+        except Exception as e:
+            logger.error(f"Error: {e}")
+        finally:
+            connection.close()
+            logger.info("MySQL connection is closed")
+            write_metrics()
+    else:
+        logger.error("Failed to connect to the database")
+
+def update_portfolio_valuations():
+    logger.info("Starting nightly portfolio valuation")
+    connection = create_database_connection()
+    if connection:
+        try:
+            from nav_snapshot import NavSnapshotReader
+            from valuation import run_nightly_valuation
+            # NAVs come from the snapshot the daily update published, unless it is out of date.
+            if run_nightly_valuation(connection, snapshot_reader=NavSnapshotReader()):
+                bump_data_version(connection, VALUATION_DATA_VERSION)
+        except Error as e:
+            logger.error(f"Database error: {e}")
+        except Exception as e:
+            logger.error(f"Error: {e}")
+        finally:
+            connection.close()
+            logger.info("MySQL connection is closed")
+    else:
+        logger.error("Failed to connect to the database")
+
+def update_fund_analytics():
+    logger.info("Updating fund analytics")
+    connection = create_database_connection()
+    if connection:
+        try:
+            from analytics import update_fund_analytics as update_analytics
+            if update_analytics(connection):
+                bump_data_version(connection, ANALYTICS_DATA_VERSION)
+        except Error as e:
+            logger.error(f"Database error: {e}")
+        except Exception as e:
+            logger.error(f"Error: {e}")
+        finally:
+            connection.close()
+            logger.info("MySQL connection is closed")
+    else:
+        logger.error("Failed to connect to the database")
+
+def execute_sip_instalments():
+    logger.info("Executing due SIP instalments")
+    connection = create_database_connection()
+    if connection:
+        try:
+            execute_due_sips(connection)
+        except Error as e:
+            logger.error(f"Database error: {e}")
+        except Exception as e:
+            logger.error(f"Error: {e}")
         finally:
-            if connection.is_connected():
-                connection.close()
-                logger.info("MySQL connection is closed")
+            connection.close()
+            logger.info("MySQL connection is closed")
+    else:
+        logger.error("Failed to connect to the database")
+
+def verify_portfolio_holdings():
+    logger.info("Verifying portfolio_holdings against sip_transactions")
+    connection = create_database_connection()
+    if connection:
+        try:
+            rebuild_holdings(connection, verify_only=True)
+        except Error as e:
+            logger.error(f"Database error: {e}")
+        except Exception as e:
+            logger.error(f"Error: {e}")
+        finally:
+            connection.close()
+            logger.info("MySQL connection is closed")
     else:
         logger.error("Failed to connect to the database")
 
 def schedule_daily_update():
+    import pytz
     ist = pytz.timezone('Asia/Kolkata')
     now = datetime.now(ist)
     scheduled_time = now.replace(hour=18, minute=0, second=0, microsecond=0)  
@@ -295,6 +562,7 @@ def schedule_daily_update():
     update_mutual_fund_data()
 
 def schedule_monthly_check():
+    import pytz
     ist = pytz.timezone('Asia/Kolkata')
     now = datetime.now(ist)
     scheduled_time = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0) + timedelta(days=28) # Approximate a month
@@ -305,16 +573,27 @@ def schedule_monthly_check():
     time.sleep(time_until_run)
     check_and_add_new_schemes()
 
-if __name__ == "__main__":
+def run_scheduler(run_now=True):
+    import schedule
+    serve_metrics()
     schedule.every().day.at("18:00").do(update_mutual_fund_data)
+    schedule.every().day.at("21:00").do(execute_sip_instalments)
+    schedule.every().day.at("22:00").do(update_fund_analytics)
+    schedule.every().day.at("23:00").do(update_portfolio_valuations)
+    schedule.every().sunday.at("02:00").do(verify_portfolio_holdings)
     schedule.every(4).weeks.do(check_and_add_new_schemes)
+    schedule.every().hour.do(retry_failed_schemes)
 
-    logger.info("Running immediate test of daily update")
-    update_mutual_fund_data()
+    if run_now:
+        logger.info("Running immediate test of daily update")
+        update_mutual_fund_data()
 
-    logger.info("Running immediate test of monthly check")
-    check_and_add_new_schemes(limit = None)
+        logger.info("Running immediate test of monthly check")
+        check_and_add_new_schemes(limit = None)
 
     while True:
         schedule.run_pending()
-        time.sleep(1)
\ No newline at end of file
+        time.sleep(1)
+
+if __name__ == "__main__":
+    run_scheduler()
@@ -0,0 +1,69 @@
+"""Table definitions shared by the web app and the ingest.
+
+Plain SQLAlchemy, so the ingest can use them without importing Flask or backend.py;
+backend.py hands `metadata` to Flask-SQLAlchemy, which puts its own models (User) in
+the same MetaData and lets db.session query these classes like any db.Model.
+db.create_tables() remains the schema of record; foreign keys to users are left out
+here so the metadata stays usable without backend.py.
+"""
+from sqlalchemy import (BigInteger, Column, Date, DateTime, Float, ForeignKey, Integer, MetaData, Numeric, String,
+                        UniqueConstraint, func)
+from sqlalchemy.orm import declarative_base
+
+metadata = MetaData()
+Base = declarative_base(metadata=metadata)
+
+
+class MutualFund(Base):
+    __tablename__ = 'mutual_funds'
+    fund_id = Column(Integer, primary_key=True, autoincrement=True, nullable=False)
+    fund_name = Column(String(300), nullable=False)
+    fund_code = Column(String(20), unique=True, nullable=False)
+    category = Column(String(50))
+    current_nav = Column(Numeric(10, 2))
+    last_updated = Column(DateTime, default=func.current_timestamp())
+
+
+class PortfolioHolding(Base):
+    __tablename__ = 'portfolio_holdings'
+    __table_args__ = (UniqueConstraint('user_id', 'fund_id', name='uq_holding_user_fund'),)
+    holding_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer)
+    fund_id = Column(Integer, ForeignKey('mutual_funds.fund_id'))
+    total_units = Column(Numeric(10, 4), nullable=False)
+    last_updated = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
+
+
+class PortfolioValuation(Base):
+    __tablename__ = 'portfolio_valuations'
+    user_id = Column(Integer, primary_key=True)
+    fund_id = Column(Integer, ForeignKey('mutual_funds.fund_id'), primary_key=True)
+    as_of_date = Column(Date, nullable=False)
+    units = Column(Numeric(14, 4), nullable=False)
+    invested = Column(Numeric(14, 2), nullable=False)
+    current_value = Column(Numeric(14, 2))
+    xirr = Column(Float)
+
+
+class FundAnalytics(Base):
+    __tablename__ = 'fund_analytics'
+    fund_id = Column(Integer, ForeignKey('mutual_funds.fund_id'), primary_key=True)
+    as_of_date = Column(Date, nullable=False)
+    history_rows = Column(Integer, nullable=False)
+    cagr_1y = Column(Float)
+    volatility_1y = Column(Float)
+    max_drawdown_1y = Column(Float)
+    cagr_3y = Column(Float)
+    volatility_3y = Column(Float)
+    max_drawdown_3y = Column(Float)
+    cagr_5y = Column(Float)
+    volatility_5y = Column(Float)
+    max_drawdown_5y = Column(Float)
+    computed_at = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
+
+
+class IngestState(Base):
+    __tablename__ = 'ingest_state'
+    name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
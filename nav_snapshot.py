@@ -0,0 +1,231 @@
+"""Current NAVs of every fund as a memory-mapped column file, shared by all web workers.
+
+The ingest publishes the file after each NAV update; web workers map it read-only, so
+the pages are shared through the OS page cache instead of each worker holding its own
+copy, and NAV reads never touch MySQL. Layout:
+
+    b'RUPYANAV' | uint32 header length | JSON header | columns, each 64-byte aligned
+
+Rows are sorted by fund_id (fund_id, fund_code, nav, nav_date, name_offsets); index_codes
+and index_rows are a sorted fund_code index into them; names holds the UTF-8 fund names.
+A new snapshot is written to a temporary file and renamed over the old one, so readers
+see either the old file or the new one, never a partial write.
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from db import get_data_version
+
+logger = logging.getLogger(__name__)
+
+NAV_SNAPSHOT_PATH = os.environ.get(
+    'RUPYA_NAV_SNAPSHOT', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'nav_snapshot.bin'))
+NAV_SNAPSHOT_CHECK_INTERVAL = 5  # seconds between stat() calls looking for a newly published file
+SNAPSHOT_MAGIC = b'RUPYANAV'
+SNAPSHOT_FORMAT = 1
+ALIGNMENT = 64
+FUND_CODE_WIDTH = 20  # mutual_funds.fund_code is VARCHAR(20)
+
+_HEADER_LENGTH = struct.Struct('<I')
+
+
+def to_datetime64(values):
+    # NumPy converts datetime objects slowly (~3us each), but nearly every fund carries one
+    # of a handful of NAV dates, so each distinct value is converted once.
+    distinct = list(dict.fromkeys(values))
+    seconds = dict(zip(distinct, np.array(distinct, dtype='datetime64[s]').view(np.int64)))
+    return np.array([seconds[value] for value in values], dtype=np.int64).view('datetime64[s]')
+
+
+def build_columns(rows):
+    """Snapshot columns from (fund_id, fund_code, fund_name, current_nav, last_updated) rows."""
+    rows = sorted(rows, key=lambda row: row[0])
+    names = [(row[2] or '').encode() for row in rows]
+    fund_codes = np.array([str(row[1]).encode() for row in rows], dtype=f'S{FUND_CODE_WIDTH}')
+    code_order = np.argsort(fund_codes, kind='stable').astype(np.int32)
+    return {
+        'fund_id': np.array([row[0] for row in rows], dtype=np.int64),
+        'fund_code': fund_codes,
+        'nav': np.array([np.nan if row[3] is None else float(row[3]) for row in rows], dtype=np.float64),
+        'nav_date': to_datetime64([row[4] for row in rows]),
+        'name_offsets': np.concatenate([[0], np.cumsum([len(name) for name in names], dtype=np.int64)]),
+        'names': np.frombuffer(b''.join(names), dtype=np.uint8),
+        'index_codes': fund_codes[code_order],
+        'index_rows': code_order,
+    }
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_nav_snapshot(rows, version=None, path=NAV_SNAPSHOT_PATH):
+    """Write rows to `path` atomically. Returns the number of funds written."""
+    columns = build_columns(rows)
+    layout = {}
+    offset = 0
+    for name, column in columns.items():
+        layout[name] = {'dtype': column.dtype.str, 'length': len(column), 'offset': offset}
+        offset = _aligned(offset + column.nbytes)
+    header = json.dumps({
+        'format': SNAPSHOT_FORMAT,
+        'version': version,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'count': len(columns['fund_id']),
+        'columns': layout,
+    }).encode()
+    data_start = _aligned(len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size + len(header))
+
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC + _HEADER_LENGTH.pack(len(header)) + header)
+            for name, column in columns.items():
+                f.seek(data_start + layout[name]['offset'])
+                f.write(np.ascontiguousarray(column).tobytes())
+            f.truncate(data_start + offset)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return len(columns['fund_id'])
+
+
+def publish_nav_snapshot(connection, path=NAV_SNAPSHOT_PATH):
+    """Write the current mutual_funds NAVs, stamped with the ingest_state NAV version."""
+    connection.commit()  # start a fresh transaction so the version and the rows agree
+    version = get_data_version(connection)
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT fund_id, fund_code, fund_name, current_nav, last_updated FROM mutual_funds")
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    connection.commit()
+    count = write_nav_snapshot(rows, version, path)
+    logger.info(f"Published NAV snapshot of {count} funds (version {version}) to {path}")
+    return count
+
+
+class NavSnapshot:
+    """Read-only view of one snapshot file. Every column is a zero-copy view of the mapping."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        prefix = len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size
+        if self._mmap[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a NAV snapshot")
+        header_length, = _HEADER_LENGTH.unpack(self._mmap[len(SNAPSHOT_MAGIC):prefix])
+        header = json.loads(self._mmap[prefix:prefix + header_length])
+        if header['format'] != SNAPSHOT_FORMAT:
+            raise ValueError(f"{path} has snapshot format {header['format']}, expected {SNAPSHOT_FORMAT}")
+        data_start = _aligned(prefix + header_length)
+        self.version = header['version']
+        self.generated_at = header['generated_at']
+        columns = {
+            name: np.frombuffer(self._mmap, dtype=np.dtype(column['dtype']), count=column['length'],
+                                offset=data_start + column['offset'])
+            for name, column in header['columns'].items()
+        }
+        self.fund_ids = columns['fund_id']
+        self.fund_codes = columns['fund_code']
+        self.navs = columns['nav']
+        self.nav_dates = columns['nav_date']
+        self._name_offsets = columns['name_offsets']
+        self._names = columns['names']
+        self._index_codes = columns['index_codes']
+        self._index_rows = columns['index_rows']
+
+    def __len__(self):
+        return len(self.fund_ids)
+
+    def find(self, fund_code):
+        """Row of fund_code, or -1."""
+        key = str(fund_code).encode()
+        if not key or len(key) > FUND_CODE_WIDTH:
+            return -1
+        position = int(np.searchsorted(self._index_codes, key))
+        if position < len(self._index_codes) and self._index_codes[position] == key:
+            return int(self._index_rows[position])
+        return -1
+
+    def entry(self, fund_code):
+        """{'fund_code', 'fund_name', 'nav', 'last_updated'} for fund_code, or None if it is unknown."""
+        row = self.find(fund_code)
+        if row < 0:
+            return None
+        nav = float(self.navs[row])
+        start, end = self._name_offsets[row], self._name_offsets[row + 1]
+        return {
+            'fund_code': self.fund_codes[row].decode(),
+            'fund_name': self._names[start:end].tobytes().decode(),
+            'nav': None if np.isnan(nav) else nav,
+            'last_updated': self.nav_dates[row].item(),  # datetime, or None for NaT
+        }
+
+
+class NavSnapshotReader:
+    """Keeps the newest published snapshot mapped, remapping when the file is replaced.
+
+    current() is cheap enough for every request: it stat()s the file at most once per
+    `check_interval`. A replaced file's old mapping stays valid for as long as anything
+    still holds arrays from it.
+    """
+
+    def __init__(self, path=NAV_SNAPSHOT_PATH, check_interval=NAV_SNAPSHOT_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._file_key = None
+        self._checked = None
+
+    def current(self):
+        """The mapped NavSnapshot, or None while no readable snapshot has been published."""
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < self.check_interval:
+            return self._snapshot
+        with self._lock:
+            if self._checked is None or now - self._checked >= self.check_interval:
+                self._checked = now
+                self._reload()
+        return self._snapshot
+
+    def _reload(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._snapshot = self._file_key = None
+            return
+        file_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_key == self._file_key:
+            return
+        try:
+            self._snapshot = NavSnapshot(self.path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Could not map NAV snapshot {self.path}: {e}")
+            return
+        self._file_key = file_key
+        logger.info(f"Mapped NAV snapshot version {self._snapshot.version} with {len(self._snapshot)} funds")
+
+    def stats(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {'mapped': False}
+        return {'mapped': True, 'funds': len(snapshot), 'version': snapshot.version,
+                'generated_at': snapshot.generated_at}
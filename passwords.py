@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+BCRYPT_LOG_ROUNDS = 12
+HASH_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+
+_executor = None
+_executor_lock = threading.Lock()
+_workers = HASH_WORKERS
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(password_hash, password):
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+def configure_hashing(workers):
+    """Size the hashing pool; 0 hashes inline in the calling thread."""
+    global _executor, _workers
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+        _workers = workers
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # spawn, not fork: the web process is multi-threaded by the time the pool starts.
+                _executor = ProcessPoolExecutor(max_workers=_workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+    return _executor
+
+
+def _discard_executor(executor):
+    """Drop a pool that broke (a child was killed); the next call starts a new one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def _run(fn, *args):
+    if not _workers:
+        return fn(*args)
+    executor = _get_executor()
+    try:
+        return executor.submit(fn, *args).result()
+    except BrokenProcessPool:
+        # A dead child (OOM kill, segfault) breaks the pool for good; without this every
+        # later login would fail until the app restarted.
+        _discard_executor(executor)
+        return _get_executor().submit(fn, *args).result()
+
+
+def hash_password(password, rounds=BCRYPT_LOG_ROUNDS):
+    """bcrypt hash of password, computed in the bounded hashing pool."""
+    return _run(_hash, password, rounds)
+
+
+def check_password(password_hash, password):
+    if not password_hash:
+        return False
+    return _run(_check, password_hash, password)
+
+
+def hash_rounds(password_hash):
+    """Work factor stored in a bcrypt hash ('$2b$12$...' -> 12)."""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(password_hash, rounds=BCRYPT_LOG_ROUNDS):
+    return hash_rounds(password_hash) != rounds
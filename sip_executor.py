@@ -0,0 +1,151 @@
+import calendar
+import logging
+from datetime import date, timedelta
+
+from mysql.connector import Error
+
+logger = logging.getLogger(__name__)
+
+SIP_CHUNK_SIZE = 50000  # mandate_id range executed per DB transaction
+SIP_CATCHUP_DAYS = 7  # instalments due on a holiday wait this long for the next published NAV
+
+# First NAV published on or after the due date, per fund; the instalment is allotted at it.
+LOAD_ALLOTMENT_NAVS_QUERY = """
+    INSERT INTO sip_nav (fund_id, nav_date, nav)
+    SELECT n.fund_id, n.nav_date, n.nav
+    FROM nav_history n
+    JOIN (
+        SELECT fund_id, MIN(nav_date) AS nav_date
+        FROM nav_history
+        WHERE nav_date BETWEEN %s AND %s
+        GROUP BY fund_id
+    ) first_nav ON first_nav.fund_id = n.fund_id AND first_nav.nav_date = n.nav_date
+"""
+
+# Due, not yet executed instalments of one mandate_id range; nav is NULL while none is published.
+LOAD_DUE_INSTALMENTS_QUERY = """
+    INSERT INTO sip_due (mandate_id, user_id, fund_id, amount, nav, units)
+    SELECT m.mandate_id, m.user_id, m.fund_id, m.amount, n.nav, ROUND(m.amount / n.nav, 4)
+    FROM sip_mandates m
+    LEFT JOIN sip_nav n ON n.fund_id = m.fund_id
+    WHERE m.mandate_id BETWEEN %s AND %s
+    AND m.status = 'active'
+    AND {due_day}
+    AND m.start_date <= %s
+    AND (m.end_date IS NULL OR m.end_date >= %s)
+    AND NOT EXISTS (
+        SELECT 1 FROM sip_transactions t
+        WHERE t.mandate_id = m.mandate_id AND t.transaction_date = %s
+    )
+"""
+
+
+def create_work_tables(cursor):
+    cursor.execute("""
+        CREATE TEMPORARY TABLE IF NOT EXISTS sip_nav (
+            fund_id INT PRIMARY KEY,
+            nav_date DATE NOT NULL,
+            nav DECIMAL(14, 4) NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TEMPORARY TABLE IF NOT EXISTS sip_due (
+            mandate_id INT PRIMARY KEY,
+            user_id INT NOT NULL,
+            fund_id INT NOT NULL,
+            amount DECIMAL(10, 2) NOT NULL,
+            nav DECIMAL(14, 4),
+            units DECIMAL(10, 4)
+        )
+    """)
+
+
+def due_day_condition(due_date):
+    """SQL filter for mandates due on due_date; a mandate on the 31st runs on the month's last day."""
+    if due_date.day == calendar.monthrange(due_date.year, due_date.month)[1]:
+        return "m.day_of_month >= %s", due_date.day
+    return "m.day_of_month = %s", due_date.day
+
+
+def execute_chunk(connection, cursor, due_date, first_id, last_id):
+    """Execute one mandate_id range for one due date in a single transaction. Returns (executed, waiting)."""
+    due_day, day = due_day_condition(due_date)
+    try:
+        cursor.execute("DELETE FROM sip_due")
+        cursor.execute(LOAD_DUE_INSTALMENTS_QUERY.format(due_day=due_day),
+                       (first_id, last_id, day, due_date, due_date, due_date))
+        cursor.execute("""
+            INSERT INTO sip_transactions
+            (mandate_id, user_id, fund_id, amount, transaction_date, nav_on_purchase, units_allotted)
+            SELECT mandate_id, user_id, fund_id, amount, %s, nav, units
+            FROM sip_due
+            WHERE nav IS NOT NULL
+        """, (due_date,))
+        executed = cursor.rowcount
+        cursor.execute("""
+            INSERT INTO portfolio_holdings (user_id, fund_id, total_units)
+            SELECT user_id, fund_id, SUM(units)
+            FROM sip_due
+            WHERE nav IS NOT NULL
+            GROUP BY user_id, fund_id
+            ON DUPLICATE KEY UPDATE
+            total_units = total_units + VALUES(total_units),
+            last_updated = CURRENT_TIMESTAMP
+        """)
+        cursor.execute("SELECT COUNT(*) FROM sip_due WHERE nav IS NULL")
+        waiting = cursor.fetchone()[0]
+        connection.commit()
+    except Error:
+        # A concurrent run for the same date trips uq_sip_mandate_date; nothing from this chunk is kept.
+        connection.rollback()
+        raise
+    return executed, waiting
+
+
+def execute_due_sips(connection, run_date=None, chunk_size=SIP_CHUNK_SIZE, catchup_days=SIP_CATCHUP_DAYS):
+    """Execute every SIP instalment due between run_date - catchup_days and run_date.
+
+    Each instalment is allotted at its fund's first NAV on or after the due date and recorded
+    with the due date as transaction_date. Instalments already in sip_transactions are skipped
+    (and uq_sip_mandate_date rejects duplicates), so any date can be re-run safely.
+    Returns {'executed': n, 'waiting': n, 'lapsed': n}.
+    """
+    run_date = run_date or date.today()
+    totals = {'executed': 0, 'waiting': 0, 'lapsed': 0}
+    cursor = connection.cursor()
+    try:
+        create_work_tables(cursor)
+        cursor.execute("SELECT MIN(mandate_id), MAX(mandate_id) FROM sip_mandates WHERE status = 'active'")
+        first_mandate, last_mandate = cursor.fetchone()
+        if first_mandate is None:
+            logger.info("No active SIP mandates")
+            return totals
+
+        for days_back in range(catchup_days, -1, -1):
+            due_date = run_date - timedelta(days=days_back)
+            cursor.execute("DELETE FROM sip_nav")
+            cursor.execute(LOAD_ALLOTMENT_NAVS_QUERY, (due_date, run_date))
+            connection.commit()
+
+            executed = waiting = 0
+            for first_id in range(first_mandate, last_mandate + 1, chunk_size):
+                chunk_executed, chunk_waiting = execute_chunk(
+                    connection, cursor, due_date, first_id, first_id + chunk_size - 1)
+                executed += chunk_executed
+                waiting += chunk_waiting
+
+            totals['executed'] += executed
+            if days_back == catchup_days:
+                totals['lapsed'] += waiting
+                if waiting:
+                    logger.warning(f"{waiting} SIP instalments due {due_date} lapsed: no NAV within {catchup_days} days")
+            else:
+                totals['waiting'] += waiting
+            if executed or waiting:
+                logger.info(f"SIP instalments due {due_date}: {executed} executed, {waiting} waiting for a NAV")
+    finally:
+        cursor.close()
+
+    logger.info(f"Executed {totals['executed']} SIP instalments for {run_date} "
+                f"({totals['waiting']} waiting for a NAV, {totals['lapsed']} lapsed)")
+    return totals
@@ -0,0 +1,245 @@
+import logging
+from datetime import date
+
+import numpy as np
+
+from db import get_data_version
+
+logger = logging.getLogger(__name__)
+
+FETCH_CHUNK_SIZE = 100000
+VALUATION_USER_CHUNK = 50000
+XIRR_ITERATIONS = 50
+XIRR_TOLERANCE = 1e-7
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+
+def to_days(dates):
+    """Dates (date objects or datetime64) as int64 days since the epoch."""
+    return (np.asarray(dates, dtype='datetime64[D]') - EPOCH).astype(np.int64)
+
+
+def load_transactions(connection, first_user_id=None, last_user_id=None):
+    """Load sip_transactions as columns: user_id, fund_id, day, amount, units (NumPy arrays)."""
+    query = """
+        SELECT user_id, fund_id, transaction_date, amount,
+               COALESCE(units_allotted, amount / nav_on_purchase, 0)
+        FROM sip_transactions
+    """
+    params = ()
+    if first_user_id is not None:
+        query += " WHERE user_id BETWEEN %s AND %s"
+        params = (first_user_id, last_user_id)
+
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    chunks = {name: [] for name in ('user_id', 'fund_id', 'day', 'amount', 'units')}
+    while True:
+        rows = cursor.fetchmany(FETCH_CHUNK_SIZE)
+        if not rows:
+            break
+        user_ids, fund_ids, dates, amounts, units = zip(*rows)
+        chunks['user_id'].append(np.array(user_ids, dtype=np.int64))
+        chunks['fund_id'].append(np.array(fund_ids, dtype=np.int64))
+        chunks['day'].append(to_days(dates))
+        chunks['amount'].append(np.array(amounts, dtype=np.float64))
+        chunks['units'].append(np.array(units, dtype=np.float64))
+    cursor.close()
+
+    empty = {'day': np.int64, 'user_id': np.int64, 'fund_id': np.int64}
+    return {
+        name: np.concatenate(parts) if parts else np.empty(0, dtype=empty.get(name, np.float64))
+        for name, parts in chunks.items()
+    }
+
+
+def load_current_navs(connection):
+    """(fund_ids, navs) from mutual_funds, sorted by fund_id for searchsorted lookups."""
+    cursor = connection.cursor()
+    cursor.execute("SELECT fund_id, current_nav FROM mutual_funds WHERE current_nav IS NOT NULL ORDER BY fund_id")
+    rows = cursor.fetchall()
+    cursor.close()
+    fund_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    navs = np.array([row[1] for row in rows], dtype=np.float64)
+    return fund_ids, navs
+
+
+def current_navs(connection, snapshot_reader=None):
+    """(fund_ids, navs) sorted by fund_id: straight from the mapped NAV snapshot when it carries
+    the current NAV version, otherwise from mutual_funds. A fund without a NAV is NaN in the
+    snapshot and missing from mutual_funds' rows; lookup_navs gives NaN for both."""
+    snapshot = snapshot_reader.current() if snapshot_reader is not None else None
+    if snapshot is not None and snapshot.version is not None and snapshot.version == get_data_version(connection):
+        return snapshot.fund_ids, snapshot.navs
+    return load_current_navs(connection)
+
+
+def lookup_navs(fund_ids, nav_fund_ids, navs):
+    """NAV for every entry of fund_ids (NaN where the fund has no NAV)."""
+    if len(nav_fund_ids) == 0:
+        return np.full(len(fund_ids), np.nan)
+    position = np.searchsorted(nav_fund_ids, fund_ids)
+    position = np.minimum(position, len(nav_fund_ids) - 1)
+    found = nav_fund_ids[position] == fund_ids
+    return np.where(found, navs[position], np.nan)
+
+
+def xirr(group, days, flows, n_groups, iterations=XIRR_ITERATIONS, tolerance=XIRR_TOLERANCE):
+    """Annualised XIRR for many cash-flow series at once.
+
+    group[i] says which series flow i belongs to. Newton's method runs on all series
+    together; each step is a couple of bincounts. Series without both an outflow and an
+    inflow, and series that do not converge, get NaN.
+    """
+    first_day = np.full(n_groups, np.iinfo(np.int64).max)
+    np.minimum.at(first_day, group, days)
+    years = (days - first_day[group]) / 365.0
+
+    has_outflow = np.bincount(group, weights=(flows < 0), minlength=n_groups) > 0
+    has_inflow = np.bincount(group, weights=(flows > 0), minlength=n_groups) > 0
+
+    rate = np.full(n_groups, 0.1)
+    converged = ~(has_outflow & has_inflow)
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        for _ in range(iterations):
+            # (1 + r) ** -t as exp(-t * log1p(r)): one log per series, one exp per flow.
+            discounted = flows * np.exp(-years * np.log1p(rate)[group])
+            value = np.bincount(group, weights=discounted, minlength=n_groups)
+            slope = np.bincount(group, weights=-years * discounted, minlength=n_groups) / (1.0 + rate)
+            step = np.where(slope != 0, value / slope, 0.0)
+            new_rate = np.maximum(rate - step, -0.9999)
+            rate = np.where(converged, rate, new_rate)
+            converged |= np.abs(step) < tolerance
+            if converged.all():
+                break
+
+            # Drop flows of converged series once they make up most of the work.
+            active = ~converged[group]
+            if active.sum() < len(group) // 2:
+                group, years, flows = group[active], years[active], flows[active]
+
+    rate[~(has_outflow & has_inflow) | ~converged | ~np.isfinite(rate)] = np.nan
+    return rate
+
+
+def value_portfolios(transactions, nav_fund_ids, navs, as_of=None):
+    """Value every (user, fund) holding in `transactions`.
+
+    Returns per-holding columns (user_id, fund_id, units, invested, current_value,
+    absolute_return, xirr) and per-user totals under the 'users' key.
+    """
+    as_of_day = to_days([as_of or date.today()])[0]
+    user_ids = transactions['user_id']
+    fund_ids = transactions['fund_id']
+
+    # One group per (user, fund); fund_id fits comfortably in the low 32 bits.
+    keys = (user_ids << 32) | fund_ids
+    holding_keys, holding = np.unique(keys, return_inverse=True)
+    n_holdings = len(holding_keys)
+    holding_user = holding_keys >> 32
+    holding_fund = holding_keys & 0xFFFFFFFF
+
+    units = np.bincount(holding, weights=transactions['units'], minlength=n_holdings)
+    invested = np.bincount(holding, weights=transactions['amount'], minlength=n_holdings)
+    current_value = units * lookup_navs(holding_fund, nav_fund_ids, navs)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        absolute_return = (current_value - invested) / invested
+
+    # Cash flows: every instalment is an outflow, today's value is the closing inflow.
+    terminal_days = np.full(n_holdings, as_of_day)
+    holding_xirr = xirr(
+        np.concatenate([holding, np.arange(n_holdings)]),
+        np.concatenate([transactions['day'], terminal_days]),
+        np.concatenate([-transactions['amount'], np.nan_to_num(current_value)]),
+        n_holdings,
+    )
+
+    users, user_index = np.unique(holding_user, return_inverse=True)
+    tx_user_index = user_index[holding]
+    n_users = len(users)
+    user_value = np.bincount(user_index, weights=np.nan_to_num(current_value), minlength=n_users)
+    user_invested = np.bincount(user_index, weights=invested, minlength=n_users)
+    user_xirr = xirr(
+        np.concatenate([tx_user_index, np.arange(n_users)]),
+        np.concatenate([transactions['day'], np.full(n_users, as_of_day)]),
+        np.concatenate([-transactions['amount'], user_value]),
+        n_users,
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        user_return = (user_value - user_invested) / user_invested
+
+    return {
+        'user_id': holding_user,
+        'fund_id': holding_fund,
+        'units': units,
+        'invested': invested,
+        'current_value': current_value,
+        'absolute_return': absolute_return,
+        'xirr': holding_xirr,
+        'users': {
+            'user_id': users,
+            'invested': user_invested,
+            'current_value': user_value,
+            'absolute_return': user_return,
+            'xirr': user_xirr,
+        },
+    }
+
+
+def value_user(connection, user_id, as_of=None, snapshot_reader=None):
+    transactions = load_transactions(connection, user_id, user_id)
+    nav_fund_ids, navs = current_navs(connection, snapshot_reader)
+    return value_portfolios(transactions, nav_fund_ids, navs, as_of)
+
+
+def save_valuations(connection, result, as_of):
+    cursor = connection.cursor()
+    query = """
+        INSERT INTO portfolio_valuations
+            (user_id, fund_id, as_of_date, units, invested, current_value, xirr)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            as_of_date = VALUES(as_of_date),
+            units = VALUES(units),
+            invested = VALUES(invested),
+            current_value = VALUES(current_value),
+            xirr = VALUES(xirr)
+    """
+    rows = [
+        (int(user_id), int(fund_id), as_of, float(units), float(invested),
+         None if np.isnan(value) else float(value), None if np.isnan(rate) else float(rate))
+        for user_id, fund_id, units, invested, value, rate in zip(
+            result['user_id'], result['fund_id'], result['units'], result['invested'],
+            result['current_value'], result['xirr'])
+    ]
+    cursor.executemany(query, rows)
+    connection.commit()
+    cursor.close()
+    return len(rows)
+
+
+def run_nightly_valuation(connection, as_of=None, user_chunk=VALUATION_USER_CHUNK, snapshot_reader=None):
+    """Value every user's portfolio in user_id ranges and store the results in portfolio_valuations."""
+    as_of = as_of or date.today()
+    nav_fund_ids, navs = current_navs(connection, snapshot_reader)
+
+    cursor = connection.cursor()
+    cursor.execute("SELECT MIN(user_id), MAX(user_id) FROM sip_transactions")
+    first_user_id, last_user_id = cursor.fetchone()
+    cursor.close()
+    if first_user_id is None:
+        logger.info("No SIP transactions to value")
+        return 0
+
+    total_holdings = 0
+    total_value = 0.0
+    for start in range(first_user_id, last_user_id + 1, user_chunk):
+        transactions = load_transactions(connection, start, start + user_chunk - 1)
+        if not len(transactions['user_id']):
+            continue
+        result = value_portfolios(transactions, nav_fund_ids, navs, as_of)
+        total_holdings += save_valuations(connection, result, as_of)
+        total_value += float(np.nansum(result['current_value']))
+
+    logger.info(f"Valued {total_holdings} holdings as of {as_of}; total value {total_value:,.2f}")
+    return total_holdings